@@ -0,0 +1,407 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import geometry
+from frame_buffers import resize_into
+from frame_sampler import AdaptiveSampler
+from landmark_cache import DEFAULT_MAX_BYTES, LandmarkCache
+from landmark_export import LandmarkExporter
+from pushup_detector import PushupDetector
+from video_decode import BACKENDS, HW_ACCEL, DecodeOptions, open_video
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".wmv")
+
+# Frame size every video is resized to before inference (matches the GUI)
+FRAME_SIZE = (800, 600)
+
+# Every worker process owns one detector (and one MediaPipe Pose graph)
+_worker_detector = None
+_worker_cache = None
+_worker_options = {}
+
+def _init_worker(thresholds=None, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES, sampling=None,
+                 compare_full=False, use_roi=False, decode=None, smoothing=False, model_complexity=1,
+                 export_dir=None):
+    """Build the detector (and cache handle) once per worker process"""
+    global _worker_detector, _worker_cache, _worker_options
+    # One process per core already; keep OpenCV from oversubscribing it
+    cv2.setNumThreads(1)
+    _worker_detector = PushupDetector(use_roi=use_roi, smoothing=smoothing, model_complexity=model_complexity)
+    for name, value in (thresholds or {}).items():
+        setattr(_worker_detector.counter, name, value)
+    _worker_cache = LandmarkCache(cache_dir, cache_max_bytes) if cache_dir else None
+    _worker_options = {"sampling": sampling, "compare_full": compare_full, "decode": decode,
+                       "export_dir": export_dir}
+
+def collect_videos(source):
+    """Return video paths from a directory or a manifest file (one path per line)"""
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name)
+            for name in os.listdir(source)
+            if name.lower().endswith(VIDEO_EXTENSIONS)
+        )
+
+    # Relative manifest entries are resolved against the manifest's folder
+    base_dir = os.path.dirname(os.path.abspath(source))
+    paths = []
+    with open(source) as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            paths.append(line if os.path.isabs(line) else os.path.join(base_dir, line))
+    return paths
+
+def inference_settings(detector, sampling=None, decode=None):
+    """Everything that changes the landmarks a video produces"""
+    settings = {"pose": detector.pose_settings, "frame_size": FRAME_SIZE, "roi": detector.roi is not None}
+    # Decoder threads never change pixels, but another backend or in-decoder scaling can
+    decode_settings = decode.pixel_settings() if decode else None
+    if decode_settings:
+        settings["decode"] = decode_settings
+    if sampling:
+        # Which frames get analysed depends on the thresholds the sampler watches
+        settings["sampling"] = dict(
+            sampling,
+            up=detector.counter.angle_threshold_up,
+            down=detector.counter.angle_threshold_down,
+        )
+    return settings
+
+def _grow(landmarks, min_frames):
+    """Extend a (T, 33, 4) array with NaN rows to at least min_frames (doubling)"""
+    extra = max(len(landmarks), min_frames - len(landmarks))
+    return np.concatenate([landmarks, geometry.empty_landmarks(extra)])
+
+def extract_landmarks(video_path, detector, sampling=None, decode=None):
+    """Run pose inference over a video.
+
+    Returns ((T, 33, 4) landmarks, video fps, frames inferred) or None. With sampling
+    ({"analysis_fps", "transition_margin"}) skipped frames are only grabbed, never
+    retrieved or run through the model, and their rows stay NaN. decode is a
+    video_decode.DecodeOptions choosing backend, decoder threads and acceleration.
+    """
+    cap = open_video(video_path, decode)
+    if not cap.isOpened():
+        return None
+
+    # Same Pose graph for every video; only the per-video state starts over
+    detector.reset()
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    sampler = None
+    if sampling:
+        sampler = AdaptiveSampler(video_fps, detector.counter.angle_threshold_up,
+                                  detector.counter.angle_threshold_down, **sampling)
+
+    # The container's frame count is only an estimate, so grow the array if needed
+    landmarks = geometry.empty_landmarks(max(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 0) + 1)
+    frame_count = 0
+    frames_inferred = 0
+    # Decode and resize into the same two buffers for the whole video
+    capture_buffer = None
+    resize_buffer = np.empty((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+
+    while True:
+        ret, capture_buffer = cap.read(capture_buffer)
+        if not ret:
+            break
+
+        if frame_count >= len(landmarks):
+            landmarks = _grow(landmarks, frame_count + 1)
+
+        # Same preprocessing as the GUI so counts match
+        frame = resize_into(capture_buffer, FRAME_SIZE, resize_buffer)
+        row = detector.run_pose(frame)[1]
+        frames_inferred += 1
+
+        # Frames without a person stay NaN
+        if row is not None:
+            landmarks[frame_count] = row
+        frame_count += 1
+
+        if sampler is not None:
+            elbow_angle = None
+            if row is not None:
+                elbow_angle = float(geometry.pushup_angles(row)[0])
+            # grab() advances past a frame without retrieving or converting it
+            for _ in range(sampler.next_stride(elbow_angle) - 1):
+                if not cap.grab():
+                    break
+                frame_count += 1
+
+    cap.release()
+    if frame_count > len(landmarks):
+        landmarks = _grow(landmarks, frame_count)
+    return landmarks[:frame_count], video_fps, frames_inferred
+
+def load_landmarks(video_path, detector, cache=None, sampling=None, decode=None):
+    """Landmarks from the cache, or from inference (then cached).
+
+    Returns (landmarks, video fps, frames inferred, cache hit) or None.
+    """
+    key = cache.key_for(video_path, inference_settings(detector, sampling, decode)) if cache else None
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        landmarks, meta = cached
+        return landmarks, meta["video_fps"], meta.get("frames_inferred", len(landmarks)), True
+
+    extracted = extract_landmarks(video_path, detector, sampling, decode)
+    if extracted is None:
+        return None
+    landmarks, video_fps, frames_inferred = extracted
+    if cache:
+        cache.put(key, landmarks, {
+            "video": video_path,
+            "video_fps": video_fps,
+            "frames": len(landmarks),
+            "frames_inferred": frames_inferred,
+        })
+    return landmarks, video_fps, frames_inferred, False
+
+def counting_landmarks(landmarks, detector, video_fps=0.0):
+    """The landmarks counting sees: smoothed when the detector smooths, else as extracted"""
+    if detector.smoother is None:
+        return landmarks
+    # Cached landmarks are raw, so smoothing settings never invalidate the cache
+    detector.smoother.reset()
+    timestamps = np.arange(len(landmarks)) / video_fps if video_fps > 0 else None
+    return detector.smoother.smooth_sequence(landmarks, timestamps)
+
+def count_reps(landmarks, detector, video_fps=0.0):
+    """Replay the rep state machine over a (T, 33, 4) landmark array; returns rep frame indices"""
+    detector.counter.reset()
+    landmarks = counting_landmarks(landmarks, detector, video_fps)
+    angles = geometry.pushup_angles(landmarks)
+    timestamps = np.arange(len(landmarks)) / video_fps if video_fps > 0 else None
+    # NaN angles (no person) never pass the threshold checks
+    return detector.counter.feed(angles[:, 0], angles[:, 1], timestamps).tolist()
+
+def export_landmarks(export_path, landmarks, detector, video_fps=0.0, meta=None):
+    """Write one video's landmarks, angles and rep ranges as a chunked export.
+
+    Counting is replayed frame by frame (same result as count_reps) so the
+    exporter sees every stage change; only one chunk is held in memory.
+    """
+    landmarks = counting_landmarks(landmarks, detector, video_fps)
+    angles = geometry.pushup_angles(landmarks)
+    counter = detector.counter
+    counter.reset()
+    exporter = LandmarkExporter(export_path, fps=video_fps or None, meta=meta)
+    try:
+        for index, (elbow_angle, hip_angle) in enumerate(angles.tolist()):
+            timestamp = index / video_fps if video_fps > 0 else None
+            # NaN rows (no person) never change the counter and are stored as NaN
+            rep = counter.update(elbow_angle, hip_angle, timestamp)
+            exporter.append(landmarks[index], angles[index], counter.stage, rep, timestamp)
+    finally:
+        exporter.close()
+
+def process_file(video_path, detector=None, cache=None, sampling=None, compare_full=False, decode=None,
+                 export_dir=None):
+    """Count pushups in one video file and return a result dict.
+
+    With compare_full, the video is also processed at full frame rate (never from
+    the cache) and the result gains a "full_rate" section showing how far sampling
+    moved the count. Its speedup is None when the sampled pass was a cache hit.
+    With export_dir, landmarks, angles and rep ranges go to export_dir/<video name>.
+    """
+    detector = detector or _worker_detector or PushupDetector()
+    cache = cache or _worker_cache
+
+    result = {
+        "video": video_path,
+        "pushup_count": 0,
+        "rep_frames": [],
+        "reps": [],
+        "rep_timestamps": [],
+        "frames_processed": 0,
+        "frames_inferred": 0,
+        "video_fps": 0.0,
+        "processing_fps": 0.0,
+        "elapsed_sec": 0.0,
+        "cache_hit": False,
+        "first_frame_ms": None,
+        "error": None,
+    }
+
+    start = time.perf_counter()
+    loaded = load_landmarks(video_path, detector, cache, sampling, decode)
+    if loaded is None:
+        result["error"] = "Could not open video file"
+        return result
+    landmarks, video_fps, frames_inferred, cache_hit = loaded
+
+    rep_frames = count_reps(landmarks, detector, video_fps)
+    elapsed = time.perf_counter() - start
+
+    result["pushup_count"] = detector.pushup_count
+    result["rep_frames"] = rep_frames
+    # Start/bottom/end frame of each up -> down -> up rep, for rep_index.py
+    last_frame = len(landmarks) - 1
+    result["reps"] = detector.counter.boundaries.all(last_frame, last_frame / video_fps if video_fps > 0 else None)
+    if video_fps > 0:
+        result["rep_timestamps"] = [round(index / video_fps, 3) for index in rep_frames]
+    result["frames_processed"] = len(landmarks)
+    result["frames_inferred"] = frames_inferred
+    result["video_fps"] = round(video_fps, 3)
+    result["elapsed_sec"] = round(elapsed, 3)
+    result["processing_fps"] = round(len(landmarks) / elapsed, 2) if elapsed > 0 else 0.0
+    result["cache_hit"] = cache_hit
+    # Pose time of this video's first frame: shows whether the reused graph stayed warm
+    first_frame_s = None if cache_hit else detector.first_frame_s
+    result["first_frame_ms"] = None if first_frame_s is None else round(first_frame_s * 1000, 2)
+
+    if export_dir:
+        export_path = os.path.join(export_dir, os.path.splitext(os.path.basename(video_path))[0])
+        export_landmarks(export_path, landmarks, detector, video_fps, meta={"video": video_path})
+        result["export"] = export_path
+
+    if compare_full and sampling:
+        full_start = time.perf_counter()
+        # Always inferred, so the speedup compares inference with inference, not with a cache replay
+        full_landmarks, _, full_inferred, _ = load_landmarks(video_path, detector, None, decode=decode)
+        full_count = len(count_reps(full_landmarks, detector, video_fps))
+        full_elapsed = time.perf_counter() - full_start
+        result["full_rate"] = {
+            "pushup_count": full_count,
+            "count_delta": result["pushup_count"] - full_count,
+            "frames_inferred": full_inferred,
+            "elapsed_sec": round(full_elapsed, 3),
+            "speedup": round(full_elapsed / elapsed, 2) if elapsed > 0 and not cache_hit else None,
+        }
+
+    return result
+
+def _safe_process_file(video_path):
+    """Pool entry point: never let one bad file take down the batch"""
+    try:
+        return process_file(video_path, **_worker_options)
+    except Exception as e:
+        return {"video": video_path, "error": f"{type(e).__name__}: {e}"}
+
+def process_videos(video_paths, workers=None, thresholds=None, cache_dir=None,
+                   cache_max_bytes=DEFAULT_MAX_BYTES, sampling=None, compare_full=False, use_roi=False,
+                   decode=None, smoothing=False, model_complexity=1, export_dir=None):
+    """Yield one result dict per video, spreading files across a process pool"""
+    workers = workers or os.cpu_count() or 1
+    init_args = (thresholds, cache_dir, cache_max_bytes, sampling, compare_full, use_roi, decode,
+                 smoothing, model_complexity, export_dir)
+
+    if workers == 1:
+        _init_worker(*init_args)
+        for path in video_paths:
+            yield _safe_process_file(path)
+        return
+
+    # Whole files are the unit of work, so chunksize 1 keeps cores evenly loaded
+    with multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=init_args) as pool:
+        for result in pool.imap_unordered(_safe_process_file, video_paths, chunksize=1):
+            yield result
+
+def main():
+    """Command line entry point for headless batch processing"""
+    parser = argparse.ArgumentParser(description="Count pushups in many videos without a GUI")
+    parser.add_argument("source", help="Directory of videos or a manifest file with one path per line")
+    parser.add_argument("-o", "--output", help="Write results as JSON lines to this file (default: stdout)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--up", type=float, default=160, help="Elbow angle for the 'up' position (default: 160)")
+    parser.add_argument("--down", type=float, default=90, help="Elbow angle for the 'down' position (default: 90)")
+    parser.add_argument("--hip", type=float, default=160, help="Minimum hip angle for a straight body (default: 160)")
+    parser.add_argument("--cache-dir", help="Cache landmarks here so re-scoring skips pose inference")
+    parser.add_argument("--cache-size-mb", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 2,
+                        help="Evict least recently used cache entries above this size (default: 2048)")
+    parser.add_argument("--analysis-fps", type=float,
+                        help="Run pose inference at about this rate, and at full rate near the up/down thresholds")
+    parser.add_argument("--transition-margin", type=float, default=15,
+                        help="Degrees around a threshold analysed at full rate (default: 15)")
+    parser.add_argument("--compare-full", action="store_true",
+                        help="Also process every frame and report count agreement and speedup")
+    parser.add_argument("--roi", action="store_true",
+                        help="Run pose on a crop around the tracked person instead of the whole frame")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto",
+                        help="Video capture backend; gstreamer also scales while decoding (default: auto)")
+    parser.add_argument("--decode-threads", type=int, default=0,
+                        help="Decoder threads per video, 0 = backend default (see video_decode.py)")
+    parser.add_argument("--hw-accel", choices=HW_ACCEL, default="none",
+                        help="Ask the backend for hardware decoding (default: none)")
+    parser.add_argument("--smooth", action="store_true",
+                        help="One-euro filter landmarks before counting (pairs well with --model-complexity 0)")
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1, 2), default=1,
+                        help="MediaPipe Pose model: 0 lite (fastest), 1 full, 2 heavy (default: 1)")
+    parser.add_argument("--hip-hysteresis", type=float, default=0,
+                        help="Degrees the hip may sag below --hip once straight (default: 0)")
+    parser.add_argument("--export-dir",
+                        help="Write per-frame landmarks, angles and rep ranges for each video under this directory")
+    args = parser.parse_args()
+
+    thresholds = {
+        "angle_threshold_up": args.up,
+        "angle_threshold_down": args.down,
+        "hip_angle_threshold": args.hip,
+        "hip_hysteresis": args.hip_hysteresis,
+    }
+    sampling = None
+    if args.analysis_fps:
+        sampling = {"analysis_fps": args.analysis_fps, "transition_margin": args.transition_margin}
+    decode = DecodeOptions(args.backend, args.decode_threads, args.hw_accel, FRAME_SIZE)
+
+    video_paths = collect_videos(args.source)
+    if not video_paths:
+        print("Error: No video files found", file=sys.stderr)
+        return 1
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    start = time.perf_counter()
+    total_frames = 0
+    failed = 0
+    compared = []
+
+    try:
+        results = process_videos(video_paths, args.workers, thresholds,
+                                 args.cache_dir, int(args.cache_size_mb * 1024 ** 2),
+                                 sampling, args.compare_full, args.roi, decode,
+                                 args.smooth, args.model_complexity, args.export_dir)
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            total_frames += result.get("frames_processed", 0)
+            if result.get("error"):
+                failed += 1
+            elif "full_rate" in result:
+                compared.append(result)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Processed {len(video_paths)} videos ({failed} failed), {total_frames} frames "
+        f"in {elapsed:.1f}s ({total_frames / elapsed if elapsed > 0 else 0:.1f} frames/s)",
+        file=sys.stderr
+    )
+    if compared:
+        agree = sum(1 for r in compared if r["full_rate"]["count_delta"] == 0)
+        mean_abs_error = sum(abs(r["full_rate"]["count_delta"]) for r in compared) / len(compared)
+        # Sampled passes replayed from the cache did no inference, so they say nothing about speed
+        timed = [r for r in compared if r["full_rate"]["speedup"] is not None]
+        sampled_time = sum(r["elapsed_sec"] for r in timed)
+        full_time = sum(r["full_rate"]["elapsed_sec"] for r in timed)
+        speedup = f"speedup {full_time / sampled_time:.2f}x" if sampled_time > 0 else "speedup n/a"
+        print(
+            f"Sampling vs full rate: {agree}/{len(compared)} counts agree, "
+            f"mean abs count error {mean_abs_error:.2f}, "
+            f"{speedup} ({len(timed)} videos not from cache)",
+            file=sys.stderr
+        )
+    return 0 if failed == 0 else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from mediapipe.framework.formats import landmark_pb2
+
+import geometry
+from pushup_detector import PushupDetector
+
+FRAME_SIZE = (800, 600)
+PERCENTILES = (50, 90, 99)
+REP_PERIOD = 1.5  # seconds per synthetic rep
+# Decoded frames kept in memory for the later stages (full-size frames are large)
+KEPT_FRAMES = 30
+# Whole-stream calls (batched geometry, bulk counting) are timed this many times
+BULK_REPEATS = 20
+
+def expected_reps(num_frames, fps=30.0, rep_period=REP_PERIOD):
+    """Reps in a synthetic stream: one per trough of the elbow angle"""
+    duration = num_frames / fps
+    return int((duration - rep_period / 2) // rep_period) + 1 if duration > rep_period / 2 else 0
+
+def synthetic_landmarks(num_frames, fps=30.0, rep_period=REP_PERIOD, noise=0.0, seed=0):
+    """A (T, 33, 4) landmark stream of a side-on pushup with a known number of reps.
+
+    The elbow angle swings between 70 and 175 degrees once per rep_period seconds
+    while shoulder, hip and knee stay in a straight line.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_frames, dtype=np.float64) / fps
+    elbow_angle = np.radians(122.5 + 52.5 * np.cos(2 * np.pi * t / rep_period))
+
+    landmarks = np.zeros((num_frames, geometry.NUM_LANDMARKS, geometry.LANDMARK_FIELDS), dtype=np.float32)
+    # Unused joints scattered around the body so arrays look realistic
+    landmarks[:, :, :2] = rng.uniform(0.3, 0.7, size=(1, geometry.NUM_LANDMARKS, 2))
+    landmarks[:, :, 3] = 0.99
+
+    arm = 0.12
+    shoulder = np.array([0.35, 0.45])
+    elbow = shoulder + np.array([0.0, arm])
+    # Forearm rotated so the shoulder-elbow-wrist angle equals elbow_angle
+    wrist = np.stack([
+        elbow[0] + arm * np.cos(-np.pi / 2 + elbow_angle),
+        elbow[1] + arm * np.sin(-np.pi / 2 + elbow_angle),
+    ], axis=1)
+
+    for left, right, point in (
+        (geometry.LEFT_SHOULDER, geometry.RIGHT_SHOULDER, shoulder),
+        (geometry.LEFT_ELBOW, geometry.RIGHT_ELBOW, elbow),
+        (geometry.LEFT_WRIST, geometry.RIGHT_WRIST, wrist),
+        (geometry.LEFT_HIP, geometry.RIGHT_HIP, np.array([0.6, 0.47])),
+        (geometry.LEFT_KNEE, geometry.RIGHT_KNEE, np.array([0.8, 0.49])),
+        (geometry.LEFT_ANKLE, geometry.RIGHT_ANKLE, np.array([0.95, 0.51])),
+    ):
+        landmarks[:, left, :2] = point
+        landmarks[:, right, :2] = point
+
+    if noise > 0:
+        landmarks[:, :, :2] += rng.normal(0.0, noise, size=landmarks[:, :, :2].shape)
+    return landmarks
+
+def to_landmark_proto(row):
+    """Wrap one (33, 4) array as a NormalizedLandmarkList, like results.pose_landmarks"""
+    return landmark_pb2.NormalizedLandmarkList(landmark=[
+        landmark_pb2.NormalizedLandmark(x=x, y=y, z=z, visibility=v) for x, y, z, v in row.tolist()
+    ])
+
+def write_synthetic_video(path, landmarks, fps=30.0, size=(1280, 720)):
+    """Render a landmark stream as a stick figure video (MJPG .avi, always available)"""
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    chain = (geometry.LEFT_WRIST, geometry.LEFT_ELBOW, geometry.LEFT_SHOULDER,
+             geometry.LEFT_HIP, geometry.LEFT_KNEE, geometry.LEFT_ANKLE)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    for row in landmarks:
+        frame[:] = (60, 60, 60)
+        points = [(int(row[i, 0] * width), int(row[i, 1] * height)) for i in chain]
+        for start, end in zip(points, points[1:]):
+            cv2.line(frame, start, end, (230, 210, 190), 18)
+        cv2.circle(frame, (points[2][0] - 40, points[2][1] - 30), 35, (230, 210, 190), -1)
+        writer.write(frame)
+    writer.release()
+
+def person_frames(num_frames=KEPT_FRAMES, size=(1280, 720)):
+    """Frames of a drawn, upright person swaying slightly, which MediaPipe does detect.
+
+    The stick figure video is never detected, and a frame without a person skips
+    the landmark model, so pose.process is timed on these instead.
+    """
+    canvas = np.full((720, 1280, 3), (90, 110, 120), dtype=np.uint8)
+    skin, shirt, pants = (140, 170, 220), (60, 60, 200), (80, 50, 30)
+    cx = 640
+    cv2.ellipse(canvas, (cx, 150), (45, 58), 0, 0, 360, skin, -1)
+    cv2.ellipse(canvas, (cx, 105), (48, 25), 0, 180, 360, (30, 30, 30), -1)
+    for side in (-1, 1):
+        cv2.circle(canvas, (cx + side * 17, 140), 6, (40, 40, 40), -1)
+    cv2.ellipse(canvas, (cx, 178), (14, 5), 0, 0, 360, (60, 60, 150), -1)
+    cv2.rectangle(canvas, (cx - 15, 200), (cx + 15, 225), skin, -1)
+    cv2.fillPoly(canvas, [np.array([(cx - 80, 225), (cx + 80, 225), (cx + 65, 420), (cx - 65, 420)])], shirt)
+    for side in (-1, 1):
+        cv2.line(canvas, (cx + side * 75, 240), (cx + side * 100, 340), shirt, 34)
+        cv2.line(canvas, (cx + side * 100, 340), (cx + side * 110, 430), skin, 28)
+        cv2.circle(canvas, (cx + side * 110, 440), 18, skin, -1)
+        cv2.line(canvas, (cx + side * 35, 420), (cx + side * 45, 550), pants, 50)
+        cv2.line(canvas, (cx + side * 45, 550), (cx + side * 50, 680), pants, 44)
+        cv2.ellipse(canvas, (cx + side * 60, 690), (35, 14), 0, 0, 360, (20, 20, 20), -1)
+    if size != (1280, 720):
+        canvas = cv2.resize(canvas, size)
+
+    frames = []
+    for i in range(num_frames):
+        # One full sway per num_frames, so cycling through the frames has no jump
+        phase = 2 * np.pi * i / num_frames
+        shift = np.float32([[1, 0, 10 * np.sin(phase)], [0, 1, 5 * np.cos(phase)]])
+        frames.append(cv2.warpAffine(canvas, shift, size, borderMode=cv2.BORDER_REPLICATE))
+    return frames
+
+def summarize(durations):
+    """Percentiles and throughput for a list of per-call durations in seconds"""
+    data = np.asarray(durations, dtype=np.float64) * 1e6
+    summary = {"n": int(data.size), "mean_us": round(float(data.mean()), 3)}
+    for p in PERCENTILES:
+        summary[f"p{p}_us"] = round(float(np.percentile(data, p)), 3)
+    summary["per_sec"] = round(1e6 / summary["mean_us"], 1) if summary["mean_us"] > 0 else None
+    return summary
+
+def bench_decode(video_path):
+    """Time cap.read() per frame; returns (durations, the first KEPT_FRAMES frames)"""
+    cap = cv2.VideoCapture(video_path)
+    durations, frames = [], []
+    while True:
+        start = time.perf_counter()
+        ret, frame = cap.read()
+        elapsed = time.perf_counter() - start
+        if not ret:
+            break
+        durations.append(elapsed)
+        if len(frames) < KEPT_FRAMES:
+            frames.append(frame)
+    cap.release()
+    return durations, frames
+
+def bench_preprocess(frames, num_frames):
+    """Time resize + BGR->RGB, as done before pose.process"""
+    durations, images = [], []
+    for i in range(num_frames):
+        start = time.perf_counter()
+        resized = cv2.resize(frames[i % len(frames)], FRAME_SIZE)
+        image = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+        durations.append(time.perf_counter() - start)
+        if len(images) < len(frames):
+            images.append(image)
+    return durations, images
+
+def bench_pose(detector, images, num_frames):
+    """Time pose.process per frame; returns (durations, frames with a person found)"""
+    durations = []
+    detected = 0
+    for image in images:
+        image.flags.writeable = False
+    for i in range(num_frames):
+        start = time.perf_counter()
+        results = detector.pose.process(images[i % len(images)])
+        durations.append(time.perf_counter() - start)
+        detected += results.pose_landmarks is not None
+    return durations, detected
+
+def bench_geometry(landmarks, protos):
+    """Time landmark conversion + per-frame angles, and the batched (T, 33, 4) path"""
+    buffer = geometry.empty_landmarks()
+    per_frame = []
+    for proto in protos:
+        start = time.perf_counter()
+        row = geometry.landmarks_to_array(proto, buffer)
+        geometry.pushup_angles(row)
+        per_frame.append(time.perf_counter() - start)
+
+    batched = []
+    for _ in range(BULK_REPEATS):
+        start = time.perf_counter()
+        geometry.pushup_angles(landmarks)
+        batched.append((time.perf_counter() - start) / len(landmarks))
+    return per_frame, batched
+
+def bench_counting(detector, landmarks):
+    """Time the rep state machine per sample; returns (durations, reps counted)"""
+    angles = geometry.pushup_angles(landmarks).tolist()
+    counter = detector.counter
+    counter.reset()
+    durations = []
+    for elbow_angle, hip_angle in angles:
+        start = time.perf_counter()
+        counter.update(elbow_angle, hip_angle)
+        durations.append(time.perf_counter() - start)
+    return durations, counter.count
+
+def bench_counting_bulk(detector, landmarks):
+    """Time RepCounter.feed over the whole stream, reported per sample"""
+    angles = geometry.pushup_angles(landmarks)
+    counter = detector.counter
+    durations = []
+    for _ in range(BULK_REPEATS):
+        counter.reset()
+        start = time.perf_counter()
+        counter.feed(angles[:, 0], angles[:, 1])
+        durations.append((time.perf_counter() - start) / len(angles))
+    return durations
+
+def bench_overlay(detector, frames, protos):
+    """Time PushupDetector.draw_overlay (text overlays + draw_landmarks) on a resized frame"""
+    durations = []
+    resized = [cv2.resize(frame, FRAME_SIZE) for frame in frames]
+    for i, proto in enumerate(protos):
+        image = resized[i % len(resized)].copy()
+        # draw_overlay takes pose results; only pose_landmarks is read
+        results = SimpleNamespace(pose_landmarks=proto)
+        start = time.perf_counter()
+        detector.draw_overlay(image, results, (123.0, 178.0), "up", 3)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(num_frames=300, fps=30.0, video_size=(1280, 720), skip_pose=False):
+    """Run every stage benchmark on synthetic fixtures and return the report dict"""
+    landmarks = synthetic_landmarks(num_frames, fps)
+    protos = [to_landmark_proto(row) for row in landmarks]
+    detector = PushupDetector()
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = os.path.join(tmp_dir, "synthetic.avi")
+        write_synthetic_video(video_path, landmarks, fps, video_size)
+        decode, frames = bench_decode(video_path)
+
+    stages["decode"] = summarize(decode)
+    if not frames:
+        raise RuntimeError("Could not decode the synthetic video")
+    preprocess, images = bench_preprocess(frames, num_frames)
+    stages["preprocess"] = summarize(preprocess)
+    if not skip_pose:
+        _, person_images = bench_preprocess(person_frames(size=video_size), KEPT_FRAMES)
+        durations, detected = bench_pose(detector, person_images, num_frames)
+        # A run where nobody is found only times person detection; keep it apart from real runs
+        name = "pose_process" if detected else "pose_process_no_person"
+        stages[name] = dict(summarize(durations), detection_rate=round(detected / num_frames, 3))
+    per_frame, batched = bench_geometry(landmarks, protos)
+    stages["geometry"] = summarize(per_frame)
+    stages["geometry_batched"] = summarize(batched)
+    counting, reps = bench_counting(detector, landmarks)
+    stages["rep_counting"] = summarize(counting)
+    stages["rep_counting_bulk"] = summarize(bench_counting_bulk(detector, landmarks))
+    stages["overlay"] = summarize(bench_overlay(detector, frames, protos))
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "opencv": cv2.__version__,
+            "mediapipe": getattr(mp, "__version__", None),
+            "numpy": np.__version__,
+            "frames": num_frames,
+            "video_size": list(video_size),
+            "expected_reps": expected_reps(num_frames, fps),
+            "counted_reps": reps,
+        },
+        "stages": stages,
+    }
+
+def compare(report, baseline):
+    """Print p50 change per stage against an earlier report"""
+    print(f"{'stage':<18}{'baseline p50':>14}{'current p50':>14}{'change':>10}")
+    for name, current in report["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+        if not previous:
+            continue
+        change = (current["p50_us"] - previous["p50_us"]) / previous["p50_us"] * 100 if previous["p50_us"] else 0.0
+        print(f"{name:<18}{previous['p50_us']:>12.1f}us{current['p50_us']:>12.1f}us{change:>+9.1f}%")
+
+def main():
+    """Command line entry point for the benchmark suite"""
+    parser = argparse.ArgumentParser(description="Benchmark the pushup detection hot path on synthetic data")
+    parser.add_argument("-n", "--frames", type=int, default=300, help="Synthetic frames per stage (default: 300)")
+    parser.add_argument("--width", type=int, default=1280, help="Synthetic video width (default: 1280)")
+    parser.add_argument("--height", type=int, default=720, help="Synthetic video height (default: 720)")
+    parser.add_argument("--skip-pose", action="store_true", help="Skip the MediaPipe pose.process stage")
+    parser.add_argument("-o", "--output", help="Write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="Earlier JSON report to compare p50 timings against")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.frames, video_size=(args.width, args.height), skip_pose=args.skip_pose)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
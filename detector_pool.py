@@ -0,0 +1,88 @@
+import asyncio
+import concurrent.futures
+
+from pushup_detector import PushupDetector
+
+class PoolBusy(Exception):
+    """Raised when every detector is in use and the wait queue is full"""
+
+class DetectorPool:
+    """A fixed set of pre-warmed PushupDetector instances for asyncio handlers.
+
+    Each detector is used by one request at a time, and blocking MediaPipe calls
+    run on a thread pool with one thread per detector. At most max_waiting
+    requests queue for a free detector; beyond that acquire() raises PoolBusy so
+    callers can push back (e.g. HTTP 503) instead of piling up work.
+    """
+    def __init__(self, size=2, max_waiting=8, factory=PushupDetector):
+        self.size = size
+        self.max_waiting = max_waiting
+        self.factory = factory
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=size, thread_name_prefix="pose")
+        self.waiting = 0
+        self._free = None
+        self.startup = None
+
+    async def start(self):
+        """Build and warm up every detector off the event loop"""
+        self._free = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        detectors = await asyncio.gather(*(
+            loop.run_in_executor(self.executor, self._build) for _ in range(self.size)
+        ))
+        for detector in detectors:
+            self._free.put_nowait(detector)
+        self.startup = detectors[0].startup_report() if detectors else None
+
+    def _build(self):
+        detector = self.factory()
+        # The first process() call pays for graph and model initialization
+        detector.warm_up()
+        return detector
+
+    def busy(self):
+        """True when a new request would be rejected by acquire()"""
+        return self._free.empty() and self.waiting >= self.max_waiting
+
+    async def acquire(self):
+        """Wait for a free detector, or raise PoolBusy if too many requests are queued"""
+        if self.busy():
+            raise PoolBusy()
+        self.waiting += 1
+        try:
+            return await self._free.get()
+        finally:
+            self.waiting -= 1
+
+    def release(self, detector):
+        """Reset the detector's per-request state and hand it to the next waiter"""
+        loop = asyncio.get_running_loop()
+
+        def reset():
+            # reset() runs a blank frame through Pose, so keep it off the event loop
+            try:
+                detector.reset()
+                detector.counter.on_rep = None
+            finally:
+                loop.call_soon_threadsafe(self._free.put_nowait, detector)
+
+        self.executor.submit(reset)
+
+    async def run(self, func, *args):
+        """Run a blocking call on the pose thread pool"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def stats(self):
+        return {
+            "size": self.size,
+            # Cold-start cost paid once at startup instead of by the first requests
+            "startup_ms": self.startup,
+            "free": self._free.qsize() if self._free else 0,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+        }
+
+    async def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        while self._free is not None and not self._free.empty():
+            self._free.get_nowait().pose.close()
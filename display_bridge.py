@@ -0,0 +1,57 @@
+import threading
+
+import numpy as np
+
+from lazy_imports import LazyModule
+
+Image = LazyModule("PIL.Image")
+
+class FrameMailbox:
+    """Single-slot handoff of the latest processed frame from a worker thread to the GUI.
+
+    The worker publishes every frame (overwriting whatever the GUI has not picked
+    up yet) and never waits on Tk. The Tk main loop polls at its own refresh rate,
+    so a fast worker costs one buffer copy per frame, not one redraw per frame.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._frame = None
+        self._count = 0
+        self._progress = 0
+        self._has_new_frame = False
+        self.frames_published = 0
+        self.frames_shown = 0
+        # Set once by finish(); read on the Tk thread
+        self.done = False
+        self.error = None
+        self.final_count = None
+
+    def publish(self, frame, count, progress):
+        """Worker thread: store a copy of the latest BGR frame (reusing one buffer)"""
+        with self._lock:
+            if self._frame is None or self._frame.shape != frame.shape:
+                self._frame = np.empty_like(frame)
+            np.copyto(self._frame, frame)
+            self._count = count
+            self._progress = progress
+            self._has_new_frame = True
+            self.frames_published += 1
+
+    def finish(self, error=None, count=None):
+        """Worker thread: processing has ended (same arguments as the completion callback)"""
+        with self._lock:
+            self.error = error
+            self.final_count = count
+            self.done = True
+
+    def take(self):
+        """Tk thread: (PIL RGB image, count, progress) if a new frame arrived, else None"""
+        with self._lock:
+            if not self._has_new_frame:
+                return None
+            self._has_new_frame = False
+            self.frames_shown += 1
+            height, width = self._frame.shape[:2]
+            # Unpacking BGR straight into an RGB image copies the buffer out under the lock
+            image = Image.frombuffer("RGB", (width, height), self._frame, "raw", "BGR", 0, 1)
+            return image, self._count, self._progress
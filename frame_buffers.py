@@ -0,0 +1,54 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+from lazy_imports import LazyModule
+
+cv2 = LazyModule("cv2")
+
+class FramePool:
+    """Preallocated frame buffers that are handed out and returned explicitly.
+
+    Threads acquire a buffer, fill it (cap.read(buf), cv2.resize(..., dst=buf))
+    and release it once the frame is no longer referenced. If every buffer is in
+    use the pool grows instead of blocking; `allocated` shows how far.
+    """
+    def __init__(self, shape, count=4, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.allocated = count
+        self._free = deque(np.empty(self.shape, dtype=dtype) for _ in range(count))
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+            self.allocated += 1
+        return np.empty(self.shape, dtype=self.dtype)
+
+    def release(self, buffer):
+        # Frames of another size (e.g. a camera that switched resolution) are not pooled
+        if buffer is not None and buffer.shape == self.shape:
+            with self._lock:
+                self._free.append(buffer)
+
+def resize_into(frame, size, dst):
+    """Resize frame to size (width, height) into dst; frames already that size are used as is"""
+    width, height = size
+    if frame.shape[0] == height and frame.shape[1] == width:
+        return frame
+    return cv2.resize(frame, size, dst=dst)
+
+class ColorBuffer:
+    """Reused destination for color conversion of frames (or ROI crops) of varying size"""
+    def __init__(self):
+        self.buffer = None
+
+    def convert(self, frame, code):
+        shape = frame.shape[:2] + (3,)
+        if self.buffer is None or self.buffer.shape != shape:
+            # Only reallocates when the input size changes (e.g. the ROI is re-centered)
+            self.buffer = np.empty(shape, dtype=np.uint8)
+        return cv2.cvtColor(frame, code, dst=self.buffer)
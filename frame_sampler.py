@@ -0,0 +1,29 @@
+import math
+
+class AdaptiveSampler:
+    """Chooses how many frames to skip between pose inferences on offline video.
+
+    Far from the up/down thresholds a rep can't change state, so frames are analysed
+    at analysis_fps. Once the elbow angle comes within transition_margin degrees of
+    either threshold, every frame is analysed until it leaves that band again.
+    """
+    def __init__(self, video_fps, up_threshold, down_threshold, analysis_fps=10.0, transition_margin=15.0):
+        self.up_threshold = up_threshold
+        self.down_threshold = down_threshold
+        self.transition_margin = transition_margin
+        # Unknown container fps: fall back to analysing every frame
+        self.base_stride = max(1, int(round(video_fps / analysis_fps))) if video_fps > 0 and analysis_fps > 0 else 1
+
+    def near_transition(self, elbow_angle):
+        """True when the elbow angle is close enough to a threshold to flip the stage"""
+        return (abs(elbow_angle - self.up_threshold) <= self.transition_margin or
+                abs(elbow_angle - self.down_threshold) <= self.transition_margin)
+
+    def next_stride(self, elbow_angle):
+        """Frames to advance before the next inference (1 means the very next frame)"""
+        # No person in view (NaN): keep sampling at the base rate to re-acquire them
+        if elbow_angle is None or math.isnan(elbow_angle):
+            return self.base_stride
+        if self.near_transition(elbow_angle):
+            return 1
+        return self.base_stride
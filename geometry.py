@@ -0,0 +1,154 @@
+import numpy as np
+
+# MediaPipe Pose produces 33 landmarks, each stored as (x, y, z, visibility)
+NUM_LANDMARKS = 33
+LANDMARK_FIELDS = 4
+
+# MediaPipe Pose landmark indices used for pushup analysis
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+# Joint angles as (first point, vertex, end point)
+ANGLE_TRIPLETS = {
+    "left_elbow": (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    "right_elbow": (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    "left_hip": (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    "right_hip": (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    "left_knee": (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    "right_knee": (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+}
+
+def triplet_indices(names):
+    """Build a (k, 3) index array for the named angles in ANGLE_TRIPLETS"""
+    return np.array([ANGLE_TRIPLETS[name] for name in names], dtype=np.intp)
+
+# Angles the pushup counter needs, elbow (up/down) and hip (body straightness), on both
+# sides, left then right, so one compute_angles call covers either orientation
+PUSHUP_SIDE_ANGLES = (("left_elbow", "left_hip"), ("right_elbow", "right_hip"))
+PUSHUP_SIDE_TRIPLETS = triplet_indices(PUSHUP_SIDE_ANGLES[0] + PUSHUP_SIDE_ANGLES[1])
+# Joints each side's angles depend on; their visibility decides which side is used
+PUSHUP_SIDE_JOINTS = np.array([
+    (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST, LEFT_HIP, LEFT_KNEE),
+    (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST, RIGHT_HIP, RIGHT_KNEE),
+], dtype=np.intp)
+# (33, 2) weights so that visibility @ weights is each side's mean visibility in one product
+PUSHUP_SIDE_WEIGHTS = np.zeros((NUM_LANDMARKS, 2), dtype=np.float32)
+PUSHUP_SIDE_WEIGHTS[PUSHUP_SIDE_JOINTS[0], 0] = 1.0 / PUSHUP_SIDE_JOINTS.shape[1]
+PUSHUP_SIDE_WEIGHTS[PUSHUP_SIDE_JOINTS[1], 1] = 1.0 / PUSHUP_SIDE_JOINTS.shape[1]
+
+def empty_landmarks(num_frames=None):
+    """Allocate a NaN-filled landmark array, (33, 4) or (T, 33, 4)"""
+    shape = (NUM_LANDMARKS, LANDMARK_FIELDS) if num_frames is None else (num_frames, NUM_LANDMARKS, LANDMARK_FIELDS)
+    return np.full(shape, np.nan, dtype=np.float32)
+
+def landmarks_to_array(pose_landmarks, out=None):
+    """Convert results.pose_landmarks to a (33, 4) float32 array, or None if no person was found"""
+    if pose_landmarks is None:
+        return None
+    if out is None:
+        out = np.empty((NUM_LANDMARKS, LANDMARK_FIELDS), dtype=np.float32)
+    # One pass over the protobuf, one copy into the (possibly reused) buffer
+    out[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark]
+    return out
+
+def compute_angles(landmarks, triplets):
+    """Angles in degrees [0, 180] at the vertex of each triplet.
+
+    landmarks is (33, 4) for one frame or (T, 33, 4) for a clip; triplets is a (k, 3)
+    index array. Returns (k,) or (T, k). Frames filled with NaN give NaN angles.
+    """
+    points = landmarks[..., :2]
+    a = points[..., triplets[:, 0], :]
+    b = points[..., triplets[:, 1], :]
+    c = points[..., triplets[:, 2], :]
+
+    ba = a - b
+    bc = c - b
+    # Unsigned angle between the two limbs from a single arctan2 per triplet
+    cross = ba[..., 0] * bc[..., 1] - ba[..., 1] * bc[..., 0]
+    dot = ba[..., 0] * bc[..., 0] + ba[..., 1] * bc[..., 1]
+    return np.degrees(np.abs(np.arctan2(cross, dot)))
+
+def side_scores(landmarks):
+    """Mean visibility of each side's pushup joints: (2,) or (T, 2), left then right"""
+    return landmarks[..., 3] @ PUSHUP_SIDE_WEIGHTS
+
+# Mean visibility the other side must lead by before counting switches to it
+SIDE_MARGIN = 0.1
+
+class SideSelector:
+    """Which side of the body the pushup angles are taken from, with hysteresis.
+
+    The first frame with a person takes the side with the higher side_scores.
+    After that the side only switches when the other side's mean visibility
+    leads by more than margin, so a near tie cannot flip the elbow and hip
+    angles back and forth between two slightly different skeletons mid-rep.
+    NaN frames never change the side. select() gives the same sides for a
+    (T, 33, 4) clip as calling it frame by frame.
+    """
+    __slots__ = ("margin", "right")
+
+    def __init__(self, margin=SIDE_MARGIN):
+        self.margin = margin
+        self.reset()
+
+    def reset(self):
+        """Forget the side (e.g. before another video)"""
+        self.right = None  # None until the first frame with a person
+
+    def select(self, landmarks):
+        """Side for a (33, 4) frame (bool, True for right) or a (T, 33, 4) clip ((T,) bool array)"""
+        scores = side_scores(landmarks)
+        to_right = scores[..., 1] > scores[..., 0] + self.margin
+        to_left = scores[..., 0] > scores[..., 1] + self.margin
+        if landmarks.ndim == 2:
+            if self.right is None:
+                if not np.isnan(scores).any():
+                    # Ties keep the left side, the previous fixed choice
+                    self.right = bool(scores[1] > scores[0])
+            elif to_right or to_left:
+                self.right = bool(to_right)
+            return bool(self.right)
+
+        decided = to_right | to_left
+        if self.right is None:
+            present = np.flatnonzero(~np.isnan(scores).any(axis=1))
+            if present.size:
+                first = present[0]
+                to_right[first] = scores[first, 1] > scores[first, 0]
+                decided[first] = True
+        # Same latch as RepCounter._latch: the latest deciding frame at or before each frame
+        last = np.maximum.accumulate(np.where(decided, np.arange(decided.size), -1))
+        right = np.where(last >= 0, to_right[np.maximum(last, 0)], bool(self.right))
+        if last.size and last[-1] >= 0:
+            self.right = bool(right[-1])
+        return right
+
+def pushup_angles(landmarks, sides=None):
+    """Elbow and hip angles from whichever side of the body the camera sees better.
+
+    The side comes from sides, a SideSelector that streaming callers keep per
+    athlete so it carries over between frames; without one a fresh selector is
+    used (per clip, or a plain per-frame choice for a single frame). Athletes
+    facing either way count without flipping the video. For a clip both sides
+    are computed in one compute_angles call and picked with np.where; for a
+    single frame only the chosen side is computed. landmarks is (33, 4) or
+    (T, 33, 4); returns (2,) or (T, 2), NaN without a person.
+    """
+    if sides is None:
+        sides = SideSelector()
+    right = sides.select(landmarks)
+    if landmarks.ndim == 2:
+        return compute_angles(landmarks, PUSHUP_SIDE_TRIPLETS[2:] if right else PUSHUP_SIDE_TRIPLETS[:2])
+    angles = compute_angles(landmarks, PUSHUP_SIDE_TRIPLETS)
+    return np.where(right[:, None], angles[:, 2:], angles[:, :2])
@@ -1,47 +1,33 @@
-import cv2
-import mediapipe as mp
-import numpy as np
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import threading
 import os
-from PIL import Image, ImageTk
 
-class PushupDetector:
-    def __init__(self):
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        self.mp_drawing = mp.solutions.drawing_utils
-        
-        # Pushup counting variables
-        self.pushup_count = 0
-        self.stage = None  # 'up' or 'down'
-        self.angle_threshold_up = 160  # Angle threshold for 'up' position
-        self.angle_threshold_down = 90  # Angle threshold for 'down' position
-        self.prev_stage = None
+import numpy as np
+
+from display_bridge import FrameMailbox
+from frame_buffers import resize_into
+from lazy_imports import LazyModule
+from pushup_detector import PushupDetector as BasePushupDetector
+from video_decode import DecodeOptions, open_video
+
+# Not needed to show the window, so imported on first use
+cv2 = LazyModule("cv2")
+Image = LazyModule("PIL.Image")
+ImageTk = LazyModule("PIL.ImageTk")
+
+class PushupDetector(BasePushupDetector):
+    """Pushup detector that processes a video file instead of the webcam"""
+    def __init__(self, use_roi=False, telemetry=None):
+        super().__init__(use_roi=use_roi, telemetry=telemetry)
         
         # Video processing variables
         self.cap = None
         self.is_processing = False
         self.video_path = None
+        # Backend, decoder threads and acceleration for video files (see video_decode.py)
+        self.decode_options = DecodeOptions(size=(800, 600))
         
-    def calculate_angle(self, a, b, c):
-        """Calculate angle between three points"""
-        a = np.array(a)  # First point
-        b = np.array(b)  # Mid point
-        c = np.array(c)  # End point
-        
-        radians = np.arctan2(c[1] - b[1], c[0] - b[0]) - np.arctan2(a[1] - b[1], a[0] - b[0])
-        angle = np.abs(radians * 180.0 / np.pi)
-        
-        if angle > 180.0:
-            angle = 360 - angle
-            
-        return angle
-    
     def process_video(self, update_callback=None, completion_callback=None):
         """Process video file for pushup detection"""
         if not self.video_path or not os.path.exists(self.video_path):
@@ -49,7 +35,7 @@ class PushupDetector:
                 completion_callback("Error: Video file not found")
             return
         
-        self.cap = cv2.VideoCapture(self.video_path)
+        self.cap = open_video(self.video_path, self.decode_options)
         
         # Check if video opened successfully
         if not self.cap.isOpened():
@@ -58,118 +44,65 @@ class PushupDetector:
             return
         
         self.is_processing = True
-        self.pushup_count = 0
-        self.stage = None
+        # The Pose graph is reused from the previous video; only the count starts over
+        self.reset()
+        
+        try:
+            self._process_frames(update_callback)
+        except Exception as e:
+            # Report instead of letting the worker thread die with the GUI still waiting
+            self.telemetry.error(e, "process_video")
+            if completion_callback:
+                completion_callback(f"Error: {type(e).__name__}: {e}")
+            return
+        finally:
+            # Release resources
+            if self.cap:
+                self.cap.release()
+            self.is_processing = False
         
+        # Call completion callback
+        if completion_callback:
+            completion_callback(None, self.pushup_count)
+    
+    def _process_frames(self, update_callback):
+        """Frame loop of process_video: decode, detect, count, draw and publish every frame"""
         frame_count = 0
         total_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        video_fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+        telemetry = self.telemetry
+        
+        # Frames are decoded and resized into the same buffers every iteration
+        capture_buffer = None
+        display_buffer = np.empty((600, 800, 3), dtype=np.uint8)
+        
+        def publish(frame, results, angles):
+            # Angles, stage, count and landmarks, with progress in place of the quit hint
+            progress = int((frame_count / total_frames) * 100) if total_frames > 0 else 0
+            self.draw_overlay(frame, results, angles, self.stage, self.pushup_count, f'Progress: {progress}%')
+            if update_callback:
+                update_callback(frame, self.pushup_count, progress)
         
         while self.cap.isOpened() and self.is_processing:
-            ret, frame = self.cap.read()
+            t = telemetry.clock()
+            ret, capture_buffer = self.cap.read(capture_buffer)
             
             if not ret:
                 break
+            t = telemetry.lap("decode", t)
             
             frame_count += 1
             
             # Resize frame for better performance
-            frame = cv2.resize(frame, (800, 600))
-            
-            # Convert to RGB
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image.flags.writeable = False
-            
-            # Make detection
-            results = self.pose.process(image)
-            
-            # Convert back to BGR
-            image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            
-            # Extract landmarks
-            try:
-                landmarks = results.pose_landmarks.landmark
-                
-                # Get coordinates for pushup detection
-                # Using left side body parts (can be changed to right side)
-                shoulder = [
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y
-                ]
-                elbow = [
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value].y
-                ]
-                wrist = [
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value].y
-                ]
-                hip = [
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y
-                ]
-                knee = [
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].y
-                ]
-                
-                # Calculate angles
-                elbow_angle = self.calculate_angle(shoulder, elbow, wrist)
-                hip_angle = self.calculate_angle(shoulder, hip, knee)
-                
-                # Pushup counting logic
-                # Check if body is straight (hip angle should be around 180)
-                if hip_angle > 160:  # Body is relatively straight
-                    # Check elbow angle for pushup positions
-                    if elbow_angle > self.angle_threshold_up:
-                        self.stage = "up"
-                    elif elbow_angle < self.angle_threshold_down and self.stage == "up":
-                        self.stage = "down"
-                        self.pushup_count += 1
-                        print(f"Pushup Count: {self.pushup_count}")
-                
-                # Visualize angles and stage
-                cv2.putText(image, f'Elbow Angle: {int(elbow_angle)}', 
-                           (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                cv2.putText(image, f'Hip Angle: {int(hip_angle)}', 
-                           (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                cv2.putText(image, f'Stage: {self.stage}', 
-                           (50, 150), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                cv2.putText(image, f'Pushups: {self.pushup_count}', 
-                           (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                
-            except Exception as e:
-                # If landmarks are not detected, continue without error
-                pass
-            
-            # Draw landmarks
-            self.mp_drawing.draw_landmarks(
-                image, 
-                results.pose_landmarks, 
-                self.mp_pose.POSE_CONNECTIONS,
-                self.mp_drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2),
-                self.mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
-            )
-            
-            # Display progress
-            progress = int((frame_count / total_frames) * 100) if total_frames > 0 else 0
-            cv2.putText(image, f'Progress: {progress}%', 
-                       (50, 550), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            frame = resize_into(capture_buffer, (800, 600), display_buffer)
+            telemetry.lap("preprocess", t)
             
-            # Call update callback with the processed frame
-            if update_callback:
-                update_callback(image, self.pushup_count, progress)
-        
-        # Release resources
-        if self.cap:
-            self.cap.release()
+            # Detect, count, draw and publish (timestamps follow the video, not the wall clock)
+            timestamp = (frame_count - 1) / video_fps if video_fps > 0 else None
+            rep = self.process_frame(frame, timestamp, frame_count - 1, publish)[2]
+            if rep:
+                print(f"Pushup Count: {self.pushup_count}")
         
-        self.is_processing = False
-        
-        # Call completion callback
-        if completion_callback:
-            completion_callback(None, self.pushup_count)
-    
     def stop_processing(self):
         """Stop video processing"""
         self.is_processing = False
@@ -177,16 +110,58 @@ class PushupDetector:
             self.cap.release()
 
 class PushupDetectorGUI:
-    def __init__(self, root):
+    def __init__(self, root, refresh_hz=30):
         self.root = root
         self.root.title("Pushup Detector")
         self.root.geometry("1000x700")
         
-        self.detector = PushupDetector()
+        # Built and warmed up in the background so the window appears immediately
+        self.detector = None
+        self.detector_ready = threading.Event()
         self.video_thread = None
         
+        # The worker hands frames over through a mailbox that Tk polls at this rate
+        self.refresh_ms = max(1, int(1000 / refresh_hz))
+        self.mailbox = None
+        # Last progress decile shown in the status line
+        self.status_decile = None
+        
+        # One canvas image item, updated in place for every displayed frame
+        self.photo = None
+        self.canvas_image = None
+        
         self.create_widgets()
         
+        threading.Thread(target=self.load_detector, daemon=True).start()
+        self.root.after(100, self.poll_detector_ready)
+        
+    def load_detector(self):
+        """Background thread: build the detector and pay model initialization up front"""
+        detector = PushupDetector()
+        detector.warm_up()
+        self.detector = detector
+        self.detector_ready.set()
+        
+    def poll_detector_ready(self):
+        """Report the model load time once the background build finishes"""
+        if not self.detector_ready.is_set():
+            self.root.after(100, self.poll_detector_ready)
+            return
+        startup = self.detector.startup_report()
+        load_ms = sum(value for value in startup.values() if value is not None)
+        # Leave any message the user already triggered (file selected, processing...) alone
+        if self.status_var.get() == "Loading pose model...":
+            self.status_var.set(f"Ready to process video (model loaded in {load_ms / 1000:.1f}s)")
+        
+    def run_detection(self, video_path, mailbox):
+        """Worker thread: wait for the detector if it is still loading, then process the video"""
+        self.detector_ready.wait()
+        if mailbox is not self.mailbox:
+            # Stopped while the model was still loading
+            return
+        self.detector.video_path = video_path
+        self.detector.process_video(mailbox.publish, mailbox.finish)
+        
     def create_widgets(self):
         # Title
         title_label = tk.Label(self.root, text="Pushup Detector", font=("Arial", 24, "bold"))
@@ -239,7 +214,7 @@ class PushupDetectorGUI:
         instructions.pack(pady=10)
         
         # Status
-        self.status_var = tk.StringVar(value="Ready to process video")
+        self.status_var = tk.StringVar(value="Loading pose model...")
         tk.Label(self.root, textvariable=self.status_var, font=("Arial", 10), fg="blue").pack(pady=5)
         
     def browse_file(self):
@@ -254,7 +229,6 @@ class PushupDetectorGUI:
         
         if file_path:
             self.file_path_var.set(file_path)
-            self.detector.video_path = file_path
             self.status_var.set(f"Selected file: {os.path.basename(file_path)}")
             
     def start_detection(self):
@@ -271,40 +245,57 @@ class PushupDetectorGUI:
         self.start_button.config(state="disabled")
         self.stop_button.config(state="normal")
         self.status_var.set("Processing video...")
+        self.status_decile = None
         
-        # Start processing in a separate thread
+        # Start processing in a separate thread; it only ever touches the mailbox,
+        # all Tk calls happen here on the main thread in poll_display
+        self.mailbox = FrameMailbox()
         self.video_thread = threading.Thread(
-            target=self.detector.process_video,
-            args=(self.update_frame, self.processing_complete)
+            target=self.run_detection,
+            args=(self.file_path_var.get(), self.mailbox)
         )
         self.video_thread.daemon = True
         self.video_thread.start()
+        self.root.after(self.refresh_ms, self.poll_display, self.mailbox)
+        
+    def poll_display(self, mailbox):
+        """Show the newest frame from the worker, then reschedule until it finishes"""
+        # A newer run replaced this mailbox: let the old polling loop end
+        if mailbox is not self.mailbox:
+            return
+        
+        update = mailbox.take()
+        if update is not None:
+            self.update_frame(*update)
+        
+        if mailbox.done:
+            self.processing_complete(mailbox.error, mailbox.final_count)
+        else:
+            self.root.after(self.refresh_ms, self.poll_display, mailbox)
         
     def stop_detection(self):
         """Stop pushup detection"""
-        self.detector.stop_processing()
+        if self.detector is not None:
+            self.detector.stop_processing()
+        # Stop polling; the worker's final frame and completion are ignored
+        self.mailbox = None
         self.start_button.config(state="normal")
         self.stop_button.config(state="disabled")
         self.status_var.set("Processing stopped by user")
         
-    def update_frame(self, frame, count, progress):
-        """Update GUI with current frame and count"""
+    def update_frame(self, pil_image, count, progress):
+        """Update GUI with current frame and count (runs on the Tk thread)"""
         # Update count display
         self.count_var.set(str(count))
         
         # Update progress display
         self.progress_var.set(f"{progress}%")
         
-        # Convert frame to RGB format
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Convert to PIL Image
-        pil_image = Image.fromarray(rgb_frame)
+        img_width, img_height = pil_image.size
         
         # Resize image to fit canvas while maintaining aspect ratio
         canvas_width = 800
         canvas_height = 600
-        img_width, img_height = pil_image.size
         
         # Calculate new dimensions to maintain aspect ratio
         scale_width = canvas_width / img_width
@@ -314,22 +305,27 @@ class PushupDetectorGUI:
         new_width = int(img_width * scale)
         new_height = int(img_height * scale)
         
-        # Resize image
-        pil_image = pil_image.resize((new_width, new_height), Image.LANCZOS)
+        # Resize image (processed frames already match the canvas, so usually skipped)
+        if (new_width, new_height) != (img_width, img_height):
+            pil_image = pil_image.resize((new_width, new_height), Image.BILINEAR)
         
-        # Convert to ImageTk format
-        self.photo = ImageTk.PhotoImage(pil_image)
+        x = (canvas_width - new_width) // 2  # Center horizontally
+        y = (canvas_height - new_height) // 2  # Center vertically
         
-        # Update canvas
-        self.canvas.create_image(
-            (canvas_width - new_width) // 2,  # Center horizontally
-            (canvas_height - new_height) // 2,  # Center vertically
-            anchor=tk.NW,
-            image=self.photo
-        )
-        
-        # Update status periodically
-        if progress % 10 == 0:
+        if self.photo is not None and (self.photo.width(), self.photo.height()) == (new_width, new_height):
+            # Same size as the last frame: copy pixels into the existing Tk image
+            self.photo.paste(pil_image)
+        else:
+            self.photo = ImageTk.PhotoImage(pil_image)
+            if self.canvas_image is None:
+                self.canvas_image = self.canvas.create_image(x, y, anchor=tk.NW, image=self.photo)
+            else:
+                self.canvas.itemconfig(self.canvas_image, image=self.photo)
+        self.canvas.coords(self.canvas_image, x, y)
+        
+        # Frames arrive at the refresh rate, not every frame, so exact multiples of 10 are easily skipped
+        if progress // 10 != self.status_decile:
+            self.status_decile = progress // 10
             self.status_var.set(f"Processing... {progress}% complete")
             
     def processing_complete(self, error=None, count=None):
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+# Bump when the stored array layout or preprocessing changes
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GiB
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class LandmarkCache:
+    """On-disk cache of per-frame (T, 33, 4) landmark arrays with an LRU size cap.
+
+    Entries are keyed by the video's content hash plus the Pose settings used to
+    produce them, so renaming a file still hits and changing the model misses.
+    Each entry is a plain .npy (loaded memory-mapped) and a small .json sidecar.
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, video_path, settings):
+        """Cache key for a video processed with the given settings dict"""
+        settings_blob = json.dumps(
+            {"version": CACHE_FORMAT_VERSION, "settings": settings}, sort_keys=True
+        ).encode()
+        settings_hash = hashlib.sha256(settings_blob).hexdigest()[:16]
+        return f"{file_digest(video_path)}-{settings_hash}"
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".npy", base + ".json"
+
+    def get(self, key):
+        """Return (landmarks, meta) for a cached entry, or None on a miss"""
+        array_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            landmarks = np.load(array_path, mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+
+        # Touch the entry so eviction sees it as recently used
+        try:
+            os.utime(array_path)
+        except FileNotFoundError:
+            pass
+        return landmarks, meta
+
+    def put(self, key, landmarks, meta):
+        """Store an entry, then evict least recently used entries over the size cap"""
+        array_path, meta_path = self._paths(key)
+
+        # Write to temp files and rename so concurrent workers never see partial entries
+        fd, tmp_array = tempfile.mkstemp(dir=self.cache_dir, suffix=".npy.tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(landmarks, dtype=np.float32))
+        fd, tmp_meta = tempfile.mkstemp(dir=self.cache_dir, suffix=".json.tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(meta, f)
+
+        os.replace(tmp_meta, meta_path)
+        os.replace(tmp_array, array_path)
+        self.evict()
+
+    def _entries(self):
+        """List (last_used, size, key) for every complete entry"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npy"):
+                continue
+            key = name[:-len(".npy")]
+            array_path, meta_path = self._paths(key)
+            try:
+                stat = os.stat(array_path)
+                size = stat.st_size + os.path.getsize(meta_path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, size, key))
+        return entries
+
+    def size_bytes(self):
+        """Total bytes used by cached entries"""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+
+import numpy as np
+
+import geometry
+from rep_counter import RepBoundaries
+
+EXPORT_FORMAT_VERSION = 1
+DEFAULT_CHUNK_FRAMES = 1024
+
+# Per-frame columns: name -> (per-frame shape, dtype); missing values are NaN
+COLUMNS = {
+    "landmarks": ((geometry.NUM_LANDMARKS, geometry.LANDMARK_FIELDS), np.float32),
+    "angles": ((2,), np.float32),  # elbow, hip
+    "timestamps": ((), np.float64),
+}
+
+def _atomic_write(path, write):
+    """Write via a temp file in the same directory and rename over path"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+class LandmarkExporter:
+    """Streams per-frame landmarks, angles and rep events to a chunked export directory.
+
+    Frames collect in one preallocated chunk per column; every chunk_frames frames
+    it is written out as <column>_<n>.npy and reused, so memory stays constant
+    however long the video is. index.json (rewritten after each chunk) lists the
+    chunks and every rep's frame range, from the frame the stage turned "up",
+    through the counted "down" frame, to the frame it is "up" again.
+    """
+    def __init__(self, export_dir, chunk_frames=DEFAULT_CHUNK_FRAMES, fps=None, meta=None):
+        self.export_dir = export_dir
+        self.chunk_frames = chunk_frames
+        self.fps = fps
+        self.meta = meta or {}
+        os.makedirs(export_dir, exist_ok=True)
+
+        self.buffers = {name: np.full((chunk_frames,) + shape, np.nan, dtype=dtype)
+                        for name, (shape, dtype) in COLUMNS.items()}
+        self.filled = 0
+        self.frames = 0
+        self.chunks = []
+        self.boundaries = RepBoundaries()
+        self.last_timestamp = None
+
+    def append(self, landmarks=None, angles=None, stage=None, rep=False, timestamp=None):
+        """Add one frame; landmarks/angles may be None for frames without a person"""
+        row = self.filled
+        self.buffers["landmarks"][row] = np.nan if landmarks is None else landmarks
+        self.buffers["angles"][row] = np.nan if angles is None else angles
+        self.buffers["timestamps"][row] = np.nan if timestamp is None else timestamp
+        self.boundaries.observe(self.frames, stage, rep, timestamp)
+        self.last_timestamp = timestamp
+
+        self.filled += 1
+        self.frames += 1
+        if self.filled == self.chunk_frames:
+            self._write_chunk()
+
+    def _write_chunk(self):
+        if self.filled == 0:
+            return
+        number = len(self.chunks)
+        for name in COLUMNS:
+            data = self.buffers[name][:self.filled]
+            _atomic_write(os.path.join(self.export_dir, f"{name}_{number:05d}.npy"),
+                          lambda f, data=data: np.save(f, data))
+        self.chunks.append({"number": number, "start_frame": self.frames - self.filled, "frames": self.filled})
+        self.filled = 0
+        self._write_index()
+
+    def _write_index(self, reps=None):
+        index = {
+            "version": EXPORT_FORMAT_VERSION,
+            "fps": self.fps,
+            "chunk_frames": self.chunk_frames,
+            "frames": self.frames,
+            "chunks": self.chunks,
+            "reps": self.boundaries.reps if reps is None else reps,
+            "meta": self.meta,
+        }
+        _atomic_write(os.path.join(self.export_dir, "index.json"),
+                      lambda f: f.write(json.dumps(index, indent=1).encode()))
+
+    def close(self):
+        """Write the last partial chunk; a rep still going at the end ends on the last frame"""
+        self._write_chunk()
+        self._write_index(self.boundaries.all(self.frames - 1, self.last_timestamp))
+
+class LandmarkExport:
+    """Random access to an export written by LandmarkExporter.
+
+    Chunks are memory-mapped on first use, so reading one rep touches only the
+    chunks its frame range overlaps.
+    """
+    def __init__(self, export_dir):
+        self.export_dir = export_dir
+        with open(os.path.join(export_dir, "index.json")) as f:
+            index = json.load(f)
+        if index.get("version") != EXPORT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported export version {index.get('version')!r}")
+        self.fps = index["fps"]
+        self.frames = index["frames"]
+        self.chunk_frames = index["chunk_frames"]
+        self.chunks = index["chunks"]
+        self.reps = index["reps"]
+        self.meta = index["meta"]
+        self._mapped = {}
+
+    def __len__(self):
+        return self.frames
+
+    def _chunk(self, name, number):
+        key = (name, number)
+        if key not in self._mapped:
+            path = os.path.join(self.export_dir, f"{name}_{number:05d}.npy")
+            self._mapped[key] = np.load(path, mmap_mode="r")
+        return self._mapped[key]
+
+    def read(self, name, start, stop):
+        """Column name ("landmarks", "angles" or "timestamps") for frames [start, stop)"""
+        start = max(start, 0)
+        stop = min(stop, self.frames)
+        if start >= stop:
+            shape, dtype = COLUMNS[name]
+            return np.empty((0,) + shape, dtype=dtype)
+        parts = []
+        # Chunks all hold chunk_frames frames except possibly the last
+        for number in range(start // self.chunk_frames, (stop - 1) // self.chunk_frames + 1):
+            chunk_start = number * self.chunk_frames
+            data = self._chunk(name, number)
+            parts.append(data[max(start - chunk_start, 0):stop - chunk_start])
+        return np.concatenate(parts) if len(parts) > 1 else np.array(parts[0])
+
+    def rep(self, number):
+        """Landmarks, angles and timestamps over rep `number`'s frame range (1-based)"""
+        info = self.reps[number - 1]
+        start, stop = info["start_frame"], info["end_frame"] + 1
+        return dict(info,
+                    landmarks=self.read("landmarks", start, stop),
+                    angles=self.read("angles", start, stop),
+                    timestamps=self.read("timestamps", start, stop))
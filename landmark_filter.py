@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+
+import geometry
+
+class OneEuroFilter:
+    """Streaming one-euro filter for (33, 4) landmark arrays.
+
+    Each coordinate is low-pass filtered with a cutoff that rises with its speed:
+    at rest jitter is smoothed away (min_cutoff Hz), in motion the cutoff grows by
+    beta per unit/s so fast reps are not delayed. With beta=0 it is a plain
+    exponential filter. Visibility is passed through unfiltered. Frames without a
+    person leave the state untouched, and the longer gap makes the next frame
+    follow the measurement almost directly.
+    """
+    # beta=1 keeps noisy landmarks (noise 0.04 on the benchmark stream) from adding reps;
+    # at 10 the jitter itself raised the cutoff and a few extra reps got through
+    def __init__(self, min_cutoff=1.0, beta=1.0, d_cutoff=1.0, fps=30.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        # Frame rate assumed when update() gets no timestamps
+        self.fps = fps
+        # Filtered output, reused every frame like PushupDetector.landmark_array
+        self.out = geometry.empty_landmarks()
+        self.reset()
+
+    def reset(self):
+        """Forget the filter state (e.g. before another video)"""
+        self._value = None
+        self._speed = np.zeros((geometry.NUM_LANDMARKS, 3), dtype=np.float32)
+        self._timestamp = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        return 1.0 / (1.0 + 1.0 / (2.0 * math.pi * cutoff * dt))
+
+    def update(self, landmarks, timestamp=None):
+        """Filter one (33, 4) landmark array (or None); returns the reused output array or None"""
+        if landmarks is None:
+            return None
+
+        if timestamp is None:
+            timestamp = 0.0 if self._timestamp is None else self._timestamp + 1.0 / self.fps
+        coords = landmarks[:, :3]
+
+        if self._value is None:
+            self._value = coords.copy()
+        else:
+            dt = timestamp - self._timestamp
+            if dt <= 0:
+                # Duplicate or out-of-order timestamp: treat as one frame apart
+                dt = 1.0 / self.fps
+            speed = (coords - self._value) / dt
+            self._speed += self._alpha(self.d_cutoff, dt) * (speed - self._speed)
+            cutoff = self.min_cutoff + self.beta * np.abs(self._speed)
+            self._value += self._alpha(cutoff, dt) * (coords - self._value)
+        self._timestamp = timestamp
+
+        self.out[:, :3] = self._value
+        self.out[:, 3] = landmarks[:, 3]
+        return self.out
+
+    def smooth_sequence(self, landmarks, timestamps=None):
+        """Filter a whole (T, 33, 4) array (NaN rows stay NaN); returns a new array"""
+        smoothed = np.array(landmarks, dtype=np.float32, copy=True)
+        present = ~np.isnan(smoothed[:, 0, 0])
+        for index in np.flatnonzero(present).tolist():
+            timestamp = timestamps[index] if timestamps is not None else index / self.fps
+            smoothed[index] = self.update(smoothed[index], timestamp)
+        return smoothed
@@ -0,0 +1,33 @@
+import importlib
+import time
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access.
+
+    `cv2 = LazyModule("cv2")` at the top of a file keeps `cv2.resize(...)` call
+    sites unchanged while moving the import cost to the first real use. Looked up
+    attributes are cached on the instance, so later accesses cost a dict lookup.
+    """
+    def __init__(self, name):
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_module", None)
+        # Seconds the real import took (None until it happens, 0 if already imported)
+        object.__setattr__(self, "load_seconds", None)
+
+    def _load(self):
+        module = self._lazy_module
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(self._lazy_name)
+            object.__setattr__(self, "load_seconds", time.perf_counter() - start)
+            object.__setattr__(self, "_lazy_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        object.__setattr__(self, attr, value)
+        return value
+
+    def __repr__(self):
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module {self._lazy_name!r} ({state})>"
@@ -0,0 +1,373 @@
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+import geometry
+from frame_buffers import ColorBuffer
+from multi_stream import open_source
+from pushup_detector import PushupDetector
+from rep_counter import RepCounter
+from roi import RoiTracker
+
+class HogPersonDetector:
+    """OpenCV's built-in HOG people detector: no model files, but tuned for upright people.
+
+    Athletes standing between sets or in a high plank are usually found; someone
+    lying flat may not be. Once a track exists its own landmarks keep it alive,
+    so the detector mostly has to catch people as they arrive.
+    """
+    def __init__(self, scale_width=480, hit_threshold=0.0):
+        self.scale_width = scale_width
+        self.hit_threshold = hit_threshold
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(self, frame):
+        """Return an (N, 4) array of normalized (x0, y0, x1, y1) person boxes"""
+        height, width = frame.shape[:2]
+        scale = min(1.0, self.scale_width / width)
+        small = cv2.resize(frame, (int(width * scale), int(height * scale))) if scale < 1.0 else frame
+        rects, _ = self.hog.detectMultiScale(small, hitThreshold=self.hit_threshold, winStride=(8, 8))
+        return _normalized_boxes(rects, small.shape)
+
+class DnnPersonDetector:
+    """Person boxes from any cv2.dnn detection model (e.g. MobileNet-SSD).
+
+    person_class is the model's class id for "person": 15 for the VOC
+    MobileNet-SSD Caffe model, 1 for the TensorFlow COCO SSD models.
+    """
+    def __init__(self, model, config="", person_class=15, confidence=0.5, input_size=(300, 300),
+                 scale=1 / 127.5, mean=127.5, swap_rb=False):
+        self.person_class = person_class
+        self.confidence = confidence
+        self.model = cv2.dnn_DetectionModel(model, config)
+        self.model.setInputSize(*input_size)
+        self.model.setInputScale(scale)
+        self.model.setInputMean((mean, mean, mean))
+        self.model.setInputSwapRB(swap_rb)
+
+    def detect(self, frame):
+        """Return an (N, 4) array of normalized (x0, y0, x1, y1) person boxes"""
+        classes, _, rects = self.model.detect(frame, confThreshold=self.confidence)
+        rects = [rect for class_id, rect in zip(np.ravel(classes), rects) if class_id == self.person_class]
+        return _normalized_boxes(rects, frame.shape)
+
+def _normalized_boxes(rects, shape):
+    """(x, y, w, h) pixel rects -> (N, 4) normalized (x0, y0, x1, y1), clipped to the frame"""
+    height, width = shape[:2]
+    boxes = np.array(rects, dtype=np.float32).reshape(-1, 4)
+    boxes[:, 2:] += boxes[:, :2]
+    boxes /= np.array([width, height, width, height], dtype=np.float32)
+    return np.clip(boxes, 0.0, 1.0)
+
+def box_iou(a, b):
+    """Intersection over union of every box in a (N, 4) against every box in b (M, 4)"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(1, -1, 4)
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+def match_boxes(track_boxes, detections, min_iou=0.3):
+    """Greedy IoU association; returns ([(track index, detection index)], unmatched detection indices)"""
+    if len(track_boxes) == 0 or len(detections) == 0:
+        return [], list(range(len(detections)))
+    iou = box_iou(track_boxes, detections)
+    matches = []
+    # Best pairs first; each track and detection is used at most once
+    for flat in np.argsort(iou, axis=None)[::-1].tolist():
+        track_index, detection_index = divmod(flat, iou.shape[1])
+        if iou[track_index, detection_index] < min_iou:
+            break
+        if any(t == track_index or d == detection_index for t, d in matches):
+            continue
+        matches.append((track_index, detection_index))
+    matched = {d for _, d in matches}
+    return matches, [d for d in range(len(detections)) if d not in matched]
+
+class PersonTrack:
+    """One athlete: a crop that follows them, their own Pose graph and their own rep counter"""
+    def __init__(self, track_id, pose, box, padding=0.3):
+        self.track_id = track_id
+        # MediaPipe Pose keeps per-person tracking state, so every track has its own graph
+        self.pose = pose
+        self.roi = RoiTracker(padding=padding, min_size=0.1)
+        self.roi.seed(box)
+        self.counter = RepCounter()
+        self.sides = geometry.SideSelector()
+        self.landmark_array = geometry.empty_landmarks()
+        self.rgb_buffer = ColorBuffer()
+        # Tight box around the athlete (normalized), used to match detections
+        self.person_box = tuple(float(v) for v in box)
+        self.results = None
+        self.landmarks = None
+        self.misses = 0
+        self.frames = 0
+        # Frames where pose found the athlete; a track that never does was a false detection
+        self.pose_frames = 0
+
+    @property
+    def box(self):
+        return self.roi.box
+
+class MultiPersonCounter:
+    """Counts pushups for several people in one camera.
+
+    A person detector runs once every detect_every frames on the whole frame.
+    Its boxes are matched to existing tracks by IoU, and unmatched ones start new
+    tracks. In between, each track follows its athlete with the crop from its own
+    landmarks, like RoiTracker in the single-person detector. Every frame, each
+    track runs Pose on its crop only and feeds its own RepCounter. A track that
+    finds no person for max_misses frames is dropped and its Pose graph is reused.
+    """
+    def __init__(self, person_detector=None, max_people=4, detect_every=10, min_iou=0.3,
+                 max_misses=15, pose_settings=None, padding=0.3):
+        self.person_detector = person_detector or HogPersonDetector()
+        self.max_people = max_people
+        self.detect_every = detect_every
+        self.min_iou = min_iou
+        self.max_misses = max_misses
+        self.pose_settings = dict(pose_settings or PushupDetector.POSE_SETTINGS)
+        self.padding = padding
+        self.tracks = []
+        self.finished_tracks = []
+        self._idle_poses = []
+        self._next_id = 1
+        self.frame_index = 0
+
+        # Cost accounting for report()
+        self.detect_ms = []
+        self.track_ms = []
+        self.frame_ms_by_people = defaultdict(list)
+        self.track_setup_ms = []
+
+    def process(self, frame, timestamp=None):
+        """Advance every track by one BGR frame; returns the active tracks"""
+        frame_start = time.perf_counter()
+        detected = False
+        if self.frame_index % self.detect_every == 0 or not self.tracks:
+            self._detect(frame)
+            detected = True
+
+        people = len(self.tracks)
+        for track in self.tracks:
+            start = time.perf_counter()
+            self._run_track(track, frame, timestamp)
+            self.track_ms.append((time.perf_counter() - start) * 1000)
+
+        for track in [t for t in self.tracks if t.misses > self.max_misses]:
+            self._drop(track)
+
+        # Frames with a detection pass are charged separately, so they don't blur the per-person cost
+        if not detected:
+            self.frame_ms_by_people[people].append((time.perf_counter() - frame_start) * 1000)
+        self.frame_index += 1
+        return self.tracks
+
+    def _detect(self, frame):
+        start = time.perf_counter()
+        detections = self.person_detector.detect(frame)
+        self.detect_ms.append((time.perf_counter() - start) * 1000)
+
+        matches, unmatched = match_boxes(self._person_boxes(), detections, self.min_iou)
+        for track_index, detection_index in matches:
+            track = self.tracks[track_index]
+            if track.misses:
+                # Pose lost them but the detector did not: re-center the crop on the detection
+                track.roi.seed(detections[detection_index])
+
+        for detection_index in unmatched:
+            if len(self.tracks) >= self.max_people:
+                break
+            box = detections[detection_index]
+            # A loose overlap with a tracked athlete is more likely them than a new person
+            if self.tracks and box_iou(box, self._person_boxes()).max() >= self.min_iou / 2:
+                continue
+            self._start_track(box)
+
+        self._merge_duplicates()
+
+    def _person_boxes(self):
+        return np.array([track.person_box for track in self.tracks], dtype=np.float32).reshape(-1, 4)
+
+    def _start_track(self, box):
+        start = time.perf_counter()
+        if self._idle_poses:
+            pose = self._idle_poses.pop()
+            pose.reset()
+        else:
+            pose = mp.solutions.pose.Pose(**self.pose_settings)
+        self.track_setup_ms.append((time.perf_counter() - start) * 1000)
+        self.tracks.append(PersonTrack(self._next_id, pose, box, self.padding))
+        self._next_id += 1
+
+    def _drop(self, track, duplicate=False):
+        self.tracks.remove(track)
+        self._idle_poses.append(track.pose)
+        track.pose = None
+        # Duplicates and false detections are not athletes, so counts() never lists them
+        if not duplicate and track.pose_frames:
+            self.finished_tracks.append(track)
+
+    def _merge_duplicates(self, max_iou=0.7):
+        """Two tracks that converged on the same athlete: keep the older one"""
+        for newer in sorted(self.tracks, key=lambda t: t.track_id, reverse=True):
+            for older in self.tracks:
+                if older.track_id < newer.track_id and box_iou(older.person_box, newer.person_box)[0, 0] > max_iou:
+                    self._drop(newer, duplicate=True)
+                    break
+
+    def _run_track(self, track, frame, timestamp):
+        crop, rect = track.roi.crop(frame)
+        image = track.rgb_buffer.convert(crop, cv2.COLOR_BGR2RGB)
+        image.flags.writeable = False
+        results = track.pose.process(image)
+        image.flags.writeable = True
+        track.results = results
+        track.frames += 1
+
+        if not results.pose_landmarks:
+            track.landmarks = None
+            track.misses += 1
+            return
+
+        track.roi.remap(results.pose_landmarks, rect, frame.shape)
+        landmarks = geometry.landmarks_to_array(results.pose_landmarks, track.landmark_array)
+        track.landmarks = landmarks
+        box = track.roi.box
+        track.roi.update(landmarks)
+        if track.roi.box is None:
+            # Too few visible landmarks to move the crop: keep it and count a miss
+            track.roi.box = box
+            track.misses += 1
+            return
+        track.misses = 0
+        track.pose_frames += 1
+        visible = landmarks[landmarks[:, 3] >= track.roi.min_visibility]
+        track.person_box = (float(visible[:, 0].min()), float(visible[:, 1].min()),
+                            float(visible[:, 0].max()), float(visible[:, 1].max()))
+
+        elbow_angle, hip_angle = geometry.pushup_angles(landmarks, track.sides)
+        track.counter.update(float(elbow_angle), float(hip_angle), timestamp, self.frame_index)
+
+    def athletes(self):
+        """Finished and active tracks that pose has found a person in"""
+        return self.finished_tracks + [track for track in self.tracks if track.pose_frames]
+
+    def counts(self):
+        """{track id: pushup count} for every athlete seen so far"""
+        return {track.track_id: track.counter.count for track in self.athletes()}
+
+    def report(self):
+        """Where the time goes, and what each extra person costs per frame"""
+        frame_means = {people: round(float(np.mean(values)), 2)
+                       for people, values in sorted(self.frame_ms_by_people.items())}
+        report = {
+            "frames": self.frame_index,
+            "athletes": len(self.athletes()),
+            "detector_runs": len(self.detect_ms),
+            "detect_ms": round(float(np.mean(self.detect_ms)), 2) if self.detect_ms else None,
+            "track_setup_ms": round(float(np.mean(self.track_setup_ms)), 2) if self.track_setup_ms else None,
+            "pose_per_person_ms": round(float(np.mean(self.track_ms)), 2) if self.track_ms else None,
+            "frame_ms_by_people": frame_means,
+            "marginal_ms_per_person": None,
+        }
+        # Slope of frame time over the number of people tracked in that frame
+        people = [p for p, values in self.frame_ms_by_people.items() for _ in values]
+        if len(set(people)) >= 2:
+            times = [ms for values in self.frame_ms_by_people.values() for ms in values]
+            report["marginal_ms_per_person"] = round(float(np.polyfit(people, times, 1)[0]), 2)
+        elif self.track_ms:
+            report["marginal_ms_per_person"] = report["pose_per_person_ms"]
+        return report
+
+    def close(self):
+        for pose in self._idle_poses + [track.pose for track in self.tracks]:
+            pose.close()
+        self._idle_poses = []
+
+def draw_tracks(image, tracks):
+    """Box, id and count for every track"""
+    height, width = image.shape[:2]
+    drawing = mp.solutions.drawing_utils
+    for track in tracks:
+        x0, y0, x1, y1 = track.box
+        p0 = (int(x0 * width), int(y0 * height))
+        p1 = (int(x1 * width), int(y1 * height))
+        color = (0, 255, 0) if track.misses == 0 else (0, 165, 255)
+        cv2.rectangle(image, p0, p1, color, 2)
+        cv2.putText(image, f'#{track.track_id}: {track.counter.count} ({track.counter.stage})',
+                    (p0[0] + 5, p0[1] + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
+        if track.landmarks is not None:
+            drawing.draw_landmarks(image, track.results.pose_landmarks, mp.solutions.pose.POSE_CONNECTIONS)
+
+def main():
+    """Command line entry point for multi-person counting"""
+    parser = argparse.ArgumentParser(description="Count pushups for several people in one camera")
+    parser.add_argument("source", nargs="?", default="0", help="Camera index, URL or video file (default: 0)")
+    parser.add_argument("--max-people", type=int, default=4, help="Most athletes tracked at once (default: 4)")
+    parser.add_argument("--detect-every", type=int, default=10,
+                        help="Run the person detector every N frames (default: 10)")
+    parser.add_argument("--dnn-model", help="cv2.dnn person detector weights (default: OpenCV's HOG detector)")
+    parser.add_argument("--dnn-config", default="", help="cv2.dnn person detector config file")
+    parser.add_argument("--person-class", type=int, default=15,
+                        help="Class id of 'person' in the dnn model (default: 15, MobileNet-SSD VOC)")
+    parser.add_argument("--no-display", action="store_true", help="Do not open a window")
+    parser.add_argument("--report", help="Write the cost report as JSON to this file")
+    args = parser.parse_args()
+
+    cap = open_source(args.source)
+    if not cap.isOpened():
+        print("Error: Could not open source")
+        return 1
+
+    person_detector = None
+    if args.dnn_model:
+        person_detector = DnnPersonDetector(args.dnn_model, args.dnn_config, args.person_class)
+    counter = MultiPersonCounter(person_detector, args.max_people, args.detect_every)
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    is_file = not args.source.isdigit()
+
+    frame = None
+    try:
+        while True:
+            ret, frame = cap.read(frame)
+            if not ret:
+                break
+            if is_file and video_fps > 0:
+                timestamp = counter.frame_index / video_fps
+            else:
+                timestamp = time.time()
+            tracks = counter.process(frame, timestamp)
+
+            if not args.no_display:
+                draw_tracks(frame, tracks)
+                cv2.imshow("Multi-person Pushup Detector", frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+        if not args.no_display:
+            cv2.destroyAllWindows()
+
+    report = counter.report()
+    counter.close()
+    print(json.dumps({"counts": counter.counts(), "cost": report}, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"counts": counter.counts(), "cost": report}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
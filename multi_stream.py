@@ -0,0 +1,251 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+import cv2
+import mediapipe as mp
+
+import geometry
+from pipeline import DropOldestQueue
+from pushup_detector import PushupDetector
+from rep_counter import RepCounter
+
+FRAME_SIZE = (800, 600)
+
+def open_source(source):
+    """cv2.VideoCapture for a camera index ("0"), RTSP/HTTP URL or file path"""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+class RateMeter:
+    """Events per second over a sliding window of recent timestamps"""
+    def __init__(self, window=60):
+        self.times = deque(maxlen=window)
+
+    def tick(self, now):
+        self.times.append(now)
+
+    def rate(self):
+        if len(self.times) < 2:
+            return 0.0
+        span = self.times[-1] - self.times[0]
+        return (len(self.times) - 1) / span if span > 0 else 0.0
+
+class StreamSource:
+    """One input stream: its capture thread, frame queue, rate limit and rep counter"""
+    def __init__(self, stream_id, source, max_fps=None, queue_size=1, drop_oldest=None):
+        self.stream_id = stream_id
+        self.source = source
+        self.max_fps = max_fps
+        # Live sources drop stale frames; files apply backpressure so no frame is lost
+        if drop_oldest is None:
+            drop_oldest = not os.path.isfile(str(source))
+        self.frames = DropOldestQueue(queue_size, drop_oldest)
+        self.counter = RepCounter(on_rep=self._on_rep)
+        self.sides = geometry.SideSelector()
+
+        self.in_flight = False  # at most one frame per stream in inference, so reps stay in order
+        self.next_due = 0.0
+        self.finished = False
+        self.error = None
+        self.frames_captured = 0
+        self.frames_inferred = 0
+        self.capture_rate = RateMeter()
+        self.inference_rate = RateMeter()
+        self.latency_ms = deque(maxlen=100)
+        self._thread = None
+
+    def _on_rep(self, count, timestamp):
+        print(f"[{self.stream_id}] Pushup Count: {count}")
+
+    def start(self, stop_event):
+        self._thread = threading.Thread(target=self._capture_loop, args=(stop_event,), daemon=True)
+        self._thread.start()
+
+    def _capture_loop(self, stop_event):
+        cap = open_source(self.source)
+        if not cap.isOpened():
+            self.error = "Could not open source"
+            self.finished = True
+            return
+        try:
+            while not stop_event.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                now = time.perf_counter()
+                self.frames.put((frame, now), stop_event)
+                self.frames_captured += 1
+                self.capture_rate.tick(now)
+        finally:
+            cap.release()
+            self.finished = True
+
+    def ready(self, now):
+        """True when the stream may send another frame to inference"""
+        return not self.in_flight and now >= self.next_due
+
+    def idle(self):
+        """Capture has ended and every captured frame has been analysed"""
+        return self.finished and not self.in_flight and self.frames.qsize() == 0
+
+    def record_inference(self, now, t_captured):
+        self.frames_inferred += 1
+        self.inference_rate.tick(now)
+        self.latency_ms.append((now - t_captured) * 1000.0)
+
+    def stats(self):
+        latency = sorted(self.latency_ms)
+        return {
+            "stream": self.stream_id,
+            "source": str(self.source),
+            "pushup_count": self.counter.count,
+            "stage": self.counter.stage,
+            "capture_fps": round(self.capture_rate.rate(), 2),
+            "inference_fps": round(self.inference_rate.rate(), 2),
+            "queue_depth": self.frames.qsize(),
+            "frames_captured": self.frames_captured,
+            "frames_inferred": self.frames_inferred,
+            "frames_dropped": self.frames.dropped,
+            "latency_p50_ms": round(latency[len(latency) // 2], 2) if latency else None,
+            "finished": self.finished,
+            "error": self.error,
+        }
+
+class InferenceScheduler:
+    """Shares a fixed pool of pose workers across many streams.
+
+    A dispatcher visits streams round-robin and hands at most one frame per stream
+    to the workers at a time, honouring each stream's max_fps. Workers run Pose in
+    static image mode because consecutive frames they see come from different cameras.
+    """
+    def __init__(self, streams, num_workers=2, pose_settings=None):
+        self.streams = streams
+        self.num_workers = num_workers
+        self.pose_settings = dict(pose_settings or PushupDetector.POSE_SETTINGS)
+        # Bounded by the pool size: the dispatcher waits when every worker is busy
+        self.work_queue = queue.Queue(maxsize=num_workers)
+        self.stop_event = threading.Event()
+        self._threads = []
+        self._next_stream = 0
+
+    def start(self):
+        for stream in self.streams:
+            stream.start(self.stop_event)
+        self._threads.append(threading.Thread(target=self._dispatch_loop, daemon=True))
+        for _ in range(self.num_workers):
+            self._threads.append(threading.Thread(target=self._worker_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=1.0)
+
+    def done(self):
+        """True once every stream has ended and drained"""
+        return all(stream.idle() for stream in self.streams)
+
+    def _dispatch_loop(self):
+        num_streams = len(self.streams)
+        while not self.stop_event.is_set():
+            dispatched = False
+            now = time.perf_counter()
+            for _ in range(num_streams):
+                stream = self.streams[self._next_stream]
+                self._next_stream = (self._next_stream + 1) % num_streams
+                if not stream.ready(now):
+                    continue
+                # Claim the stream before taking a frame so idle() never sees it in between
+                stream.in_flight = True
+                item = stream.frames.get(timeout=0)
+                if item is None:
+                    stream.in_flight = False
+                    continue
+
+                if stream.max_fps:
+                    stream.next_due = now + 1.0 / stream.max_fps
+                while not self.stop_event.is_set():
+                    try:
+                        self.work_queue.put((stream, item), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                dispatched = True
+
+            if not dispatched:
+                time.sleep(0.001)
+
+    def _worker_loop(self):
+        pose = mp.solutions.pose.Pose(static_image_mode=True, **self.pose_settings)
+        landmark_array = geometry.empty_landmarks()
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    stream, (frame, t_captured) = self.work_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+
+                try:
+                    frame = cv2.resize(frame, FRAME_SIZE)
+                    image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    image.flags.writeable = False
+                    results = pose.process(image)
+
+                    row = geometry.landmarks_to_array(results.pose_landmarks, landmark_array)
+                    if row is not None:
+                        elbow_angle, hip_angle = geometry.pushup_angles(row, stream.sides)
+                        stream.counter.update(float(elbow_angle), float(hip_angle), t_captured)
+
+                    stream.record_inference(time.perf_counter(), t_captured)
+                except Exception as e:
+                    # One bad frame must not take the worker (and every stream it serves) down
+                    stream.error = f"{type(e).__name__}: {e}"
+                finally:
+                    # Otherwise the stream is never scheduled again and done() never returns True
+                    stream.in_flight = False
+        finally:
+            pose.close()
+
+    def stats(self):
+        """Per-stream counts, fps and queue depth"""
+        return [stream.stats() for stream in self.streams]
+
+def main():
+    """Command line entry point for multi-stream counting"""
+    parser = argparse.ArgumentParser(description="Count pushups on several cameras with a shared pool of pose workers")
+    parser.add_argument("sources", nargs="+", help="Camera indices, RTSP/HTTP URLs or video files")
+    parser.add_argument("-w", "--workers", type=int, default=2, help="Pose workers shared by all streams (default: 2)")
+    parser.add_argument("--max-fps", type=float, help="Per-stream inference rate limit")
+    parser.add_argument("--stats-interval", type=float, default=5.0, help="Seconds between stats lines (default: 5)")
+    args = parser.parse_args()
+
+    streams = [StreamSource(f"stream{i}", source, args.max_fps) for i, source in enumerate(args.sources)]
+    scheduler = InferenceScheduler(streams, args.workers)
+    scheduler.start()
+    print(f"Counting on {len(streams)} streams with {args.workers} pose workers. Press Ctrl+C to stop.")
+
+    try:
+        next_report = time.perf_counter() + args.stats_interval
+        while not scheduler.done():
+            time.sleep(0.1)
+            if time.perf_counter() >= next_report:
+                print(json.dumps({"streams": scheduler.stats()}))
+                next_report += args.stats_interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+
+    print(json.dumps({"streams": scheduler.stats()}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
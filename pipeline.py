@@ -0,0 +1,251 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from frame_buffers import FramePool, resize_into
+
+class DropOldestQueue:
+    """Bounded queue; when full, either drops the oldest item or blocks the producer"""
+    def __init__(self, maxsize=2, drop_oldest=True, on_drop=None):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+        # Called with every dropped item, e.g. to recycle its frame buffer
+        self.on_drop = on_drop
+
+    def put(self, item, stop_event=None):
+        if not self.drop_oldest:
+            # Backpressure: wait for the consumer, but wake up on shutdown
+            while not (stop_event and stop_event.is_set()):
+                try:
+                    self._queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+            return
+
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    dropped = self._queue.get_nowait()
+                    self.dropped += 1
+                    if self.on_drop is not None:
+                        self.on_drop(dropped)
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=0.1):
+        """Return the next item, or None if nothing arrived within timeout"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def qsize(self):
+        return self._queue.qsize()
+
+class FramePacket:
+    """A frame plus the timestamps it collects on its way through the pipeline"""
+    __slots__ = ("frame", "pool", "index", "t_read_start", "t_captured", "t_infer_start",
+                 "t_counted", "t_render_start", "t_displayed", "results", "angles",
+                 "stage", "count")
+
+    def __init__(self, frame, pool, index, t_read_start, t_captured):
+        self.frame = frame
+        self.pool = pool  # FramePool the frame buffer goes back to
+        self.index = index
+        self.t_read_start = t_read_start
+        self.t_captured = t_captured
+        self.t_infer_start = 0.0
+        self.t_counted = 0.0
+        self.t_render_start = 0.0
+        self.t_displayed = 0.0
+        self.results = None
+        self.angles = None
+        self.stage = None
+        self.count = 0
+
+    def release(self):
+        """Return the frame buffer to its pool once nothing references it"""
+        if self.pool is not None:
+            self.pool.release(self.frame)
+        self.frame = None
+
+class LatencyStats:
+    """Rolling per-stage latency samples in milliseconds"""
+    STAGES = ("capture", "capture_queue", "inference", "render_queue", "render",
+              "glass_to_count", "glass_to_display")
+
+    def __init__(self, window=1000):
+        self.samples = {name: deque(maxlen=window) for name in self.STAGES}
+
+    def record(self, packet):
+        ms = 1000.0
+        self.samples["capture"].append((packet.t_captured - packet.t_read_start) * ms)
+        self.samples["capture_queue"].append((packet.t_infer_start - packet.t_captured) * ms)
+        self.samples["inference"].append((packet.t_counted - packet.t_infer_start) * ms)
+        self.samples["render_queue"].append((packet.t_render_start - packet.t_counted) * ms)
+        self.samples["render"].append((packet.t_displayed - packet.t_render_start) * ms)
+        self.samples["glass_to_count"].append((packet.t_counted - packet.t_captured) * ms)
+        self.samples["glass_to_display"].append((packet.t_displayed - packet.t_captured) * ms)
+
+    def summary(self):
+        """Return {stage: {p50, p95, mean}} over the current window"""
+        report = {}
+        for name, values in self.samples.items():
+            if not values:
+                continue
+            data = np.fromiter(values, dtype=np.float64)
+            report[name] = {
+                "p50": round(float(np.percentile(data, 50)), 2),
+                "p95": round(float(np.percentile(data, 95)), 2),
+                "mean": round(float(data.mean()), 2),
+            }
+        return report
+
+class PipelinedDetector:
+    """Runs capture, inference and render on separate threads joined by bounded queues"""
+    def __init__(self, detector, source=0, queue_size=2, drop_oldest=True):
+        self.detector = detector
+        self.source = source
+        self.capture_queue = DropOldestQueue(queue_size, drop_oldest, on_drop=FramePacket.release)
+        self.render_queue = DropOldestQueue(queue_size, drop_oldest, on_drop=FramePacket.release)
+        # Frames live in reused buffers; enough for every queue slot plus one per stage
+        self.pool_size = 2 * queue_size + 3
+        self.capture_pool = None  # sized from the first camera frame
+        self.display_pool = FramePool((600, 800, 3), self.pool_size)
+        self.stats = LatencyStats()
+        self.stop_event = threading.Event()
+        # Exception that stopped the inference thread, re-raised by run()
+        self.error = None
+        self.frames_captured = 0
+        self.frames_inferred = 0
+        self.frames_displayed = 0
+
+    def _capture_loop(self, cap):
+        """Read frames as fast as the camera delivers them"""
+        index = 0
+        while not self.stop_event.is_set():
+            buffer = self.capture_pool.acquire() if self.capture_pool else None
+            t_read_start = time.perf_counter()
+            ret, frame = cap.read(buffer)
+            if not ret:
+                print("Error: Could not read frame")
+                break
+            if self.capture_pool is None:
+                self.capture_pool = FramePool(frame.shape, self.pool_size)
+            packet = FramePacket(frame, self.capture_pool, index, t_read_start, time.perf_counter())
+            self.capture_queue.put(packet, self.stop_event)
+            self.frames_captured += 1
+            index += 1
+        self.stop_event.set()
+
+    def _inference_loop(self):
+        """Pose estimation and rep counting on the freshest captured frame"""
+        detector = self.detector
+        try:
+            while not self.stop_event.is_set():
+                packet = self.capture_queue.get()
+                if packet is None:
+                    continue
+                packet.t_infer_start = time.perf_counter()
+
+                # Resize frame for better performance
+                display_buffer = self.display_pool.acquire()
+                frame = resize_into(packet.frame, (800, 600), display_buffer)
+                if frame is display_buffer:
+                    packet.release()
+                    packet.pool = self.display_pool
+                else:
+                    # Camera already delivers 800x600: keep the captured buffer
+                    self.display_pool.release(display_buffer)
+                # Rendering happens later on the caller's thread, so the frame is closed here
+                packet.results, packet.angles, rep = detector.process_frame(frame, packet.t_captured, packet.index)
+                if rep:
+                    print(f"Pushup Count: {detector.pushup_count}")
+
+                # Overlays are drawn on the resized BGR frame, no need to convert back
+                packet.frame = frame
+                packet.stage = detector.stage
+                packet.count = detector.pushup_count
+                packet.t_counted = time.perf_counter()
+                self.frames_inferred += 1
+
+                self.render_queue.put(packet, self.stop_event)
+        except Exception as e:
+            # Stop the other stages too, or the window would freeze waiting for frames
+            detector.telemetry.error(e, "pipeline")
+            self.error = e
+            self.stop_event.set()
+
+    def _render(self, packet):
+        """Draw overlays and show the frame; returns False when the user quits"""
+        image = packet.frame
+        # Stage and count as of this frame, not the detector's current ones
+        self.detector.draw_overlay(image, packet.results, packet.angles, packet.stage, packet.count)
+
+        cv2.imshow('Pushup Detector', image)
+        # Inference no longer waits on the UI, so poll the keyboard as briefly as possible
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
+
+    def run(self):
+        """Start the pipeline and block until the user quits; returns the pushup count"""
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print("Error: Could not open camera")
+            return None
+
+        # Keep the driver from buffering stale frames on top of our own queue
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        threads = [
+            threading.Thread(target=self._capture_loop, args=(cap,), daemon=True),
+            threading.Thread(target=self._inference_loop, daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        # HighGUI windows must be driven from the thread that created them,
+        # so the render stage runs on the caller's thread
+        try:
+            while not self.stop_event.is_set():
+                packet = self.render_queue.get()
+                if packet is None:
+                    continue
+                packet.t_render_start = time.perf_counter()
+                keep_running = self._render(packet)
+                packet.t_displayed = time.perf_counter()
+                packet.release()
+                self.stats.record(packet)
+                self.frames_displayed += 1
+                if not keep_running:
+                    break
+        finally:
+            self.stop_event.set()
+            for thread in threads:
+                thread.join(timeout=1.0)
+            cap.release()
+            cv2.destroyAllWindows()
+
+        if self.error is not None:
+            raise self.error
+        return self.detector.pushup_count
+
+    def report(self):
+        """Frame counters, queue drops and per-stage latency percentiles"""
+        return {
+            "frames_captured": self.frames_captured,
+            "frames_inferred": self.frames_inferred,
+            "frames_displayed": self.frames_displayed,
+            "capture_queue_dropped": self.capture_queue.dropped,
+            "render_queue_dropped": self.render_queue.dropped,
+            "frame_buffers_allocated": self.display_pool.allocated + (self.capture_pool.allocated if self.capture_pool else 0),
+            "latency_ms": self.stats.summary(),
+        }
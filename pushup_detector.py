@@ -1,24 +1,116 @@
-import cv2
-import mediapipe as mp
+import argparse
+import json
 import numpy as np
 import time
 
+import geometry
+from frame_buffers import ColorBuffer, resize_into
+from landmark_export import LandmarkExporter
+from landmark_filter import OneEuroFilter
+from lazy_imports import LazyModule
+from rep_counter import RepCounter
+from roi import RoiTracker
+from telemetry import NULL_TELEMETRY, telemetry_from_paths
+
+# Imported on first use, so importing this module (or showing a GUI) stays fast
+cv2 = LazyModule("cv2")
+mp = LazyModule("mediapipe")
+
 class PushupDetector:
-    def __init__(self):
+    # MediaPipe Pose settings (also part of the landmark cache key)
+    POSE_SETTINGS = {
+        "min_detection_confidence": 0.5,
+        "min_tracking_confidence": 0.5,
+    }
+    
+    def __init__(self, use_roi=False, smoothing=False, model_complexity=1, telemetry=None):
+        start = time.perf_counter()
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
         self.mp_drawing = mp.solutions.drawing_utils
+        imported = time.perf_counter()
+        # 0 (lite) is the cheapest model; it is noisier, which smoothing makes up for
+        self.pose_settings = dict(self.POSE_SETTINGS, model_complexity=model_complexity)
+        # The Pose graph is built once; reset() readies it for another video
+        self.pose = self.mp_pose.Pose(**self.pose_settings)
+        
+        # Cold-start costs in seconds (see startup_report)
+        self.startup_timings = {
+            "import_mediapipe_s": imported - start,
+            "pose_init_s": time.perf_counter() - imported,
+            "warm_up_s": None,
+            "first_frame_s": None,
+        }
+        # Pose time of the first frame since the last reset(), i.e. of the current video
+        self.first_frame_s = None
+        self._first_frame_pending = True
+        # Processed by reset(): a frame without a person makes video-mode Pose drop its tracked person
+        self.blank_frame = np.zeros((256, 256, 3), dtype=np.uint8)
+        
+        # Pushup counting state machine (thresholds live on the counter)
+        self.counter = RepCounter(
+            angle_threshold_up=160,  # Angle threshold for 'up' position
+            angle_threshold_down=90,  # Angle threshold for 'down' position
+            hip_angle_threshold=160,  # Minimum hip angle for a straight body
+        )
+        # Side of the body the angles come from, kept across frames so near ties don't flip it
+        self.sides = geometry.SideSelector()
+        
+        # Reused (33, 4) landmark buffer, filled in place every frame
+        self.landmark_array = geometry.empty_landmarks()
+        # Reused RGB buffer for the pose input
+        self.rgb_buffer = ColorBuffer()
         
-        # Pushup counting variables
-        self.pushup_count = 0
-        self.stage = None  # 'up' or 'down'
-        self.angle_threshold_up = 160  # Angle threshold for 'up' position
-        self.angle_threshold_down = 90  # Angle threshold for 'down' position
-        self.prev_stage = None
+        # Optional crop around the athlete to shrink per-frame pixel work
+        self.roi = RoiTracker() if use_roi else None
         
+        # Optional temporal filter between pose and counting (see smooth)
+        self.smoother = OneEuroFilter() if smoothing else None
+        
+        # Stage timers and counters; the default records nothing and costs next to nothing
+        self.telemetry = telemetry or NULL_TELEMETRY
+        # Optional landmark_export.LandmarkExporter fed every frame (owned by the caller)
+        self.exporter = None
+        # Landmark and connection DrawingSpecs, built on the first draw_overlay
+        self.drawing_specs = None
+        
+    def reset(self):
+        """Clear per-video state (count, stage, ROI, tracked person) while keeping the Pose graph warm"""
+        # Video-mode Pose tracks across frames; without this the last clip's person seeds the next one.
+        # pose.reset() would restart the graph and throw away the warm-up; a blank frame only ends
+        # tracking (x, y, z then match a fresh graph; visibility keeps a low-pass tail for ~30 frames)
+        self.pose.process(self.blank_frame)
+        self._first_frame_pending = True
+        self.counter.reset()
+        self.sides.reset()
+        if self.roi is not None:
+            self.roi.reset()
+        if self.smoother is not None:
+            self.smoother.reset()
+    
+    def warm_up(self):
+        """Run one inference on a blank frame so the first real frame skips model initialization"""
+        start = time.perf_counter()
+        # reset()'s blank frame is the warm-up inference
+        self.reset()
+        self.startup_timings["warm_up_s"] = time.perf_counter() - start
+    
+    def startup_report(self):
+        """Cold-start timings in milliseconds (None for steps that have not happened)"""
+        report = {name[:-2] + "_ms": None if seconds is None else round(seconds * 1000, 2)
+                  for name, seconds in self.startup_timings.items()}
+        report["import_cv2_ms"] = None if cv2.load_seconds is None else round(cv2.load_seconds * 1000, 2)
+        return report
+    
+    @property
+    def pushup_count(self):
+        """Pushups counted so far"""
+        return self.counter.count
+    
+    @property
+    def stage(self):
+        """Current position: 'up', 'down' or None"""
+        return self.counter.stage
+    
     def calculate_angle(self, a, b, c):
         """Calculate angle between three points"""
         a = np.array(a)  # First point
@@ -33,6 +125,131 @@ class PushupDetector:
             
         return angle
     
+    def run_pose(self, frame):
+        """Run MediaPipe Pose on a BGR frame.
+        
+        Returns (results, landmarks): landmarks is the reused (33, 4) array in
+        full-frame coordinates, or None if no person was found. With ROI enabled
+        only the crop around the athlete is color converted and processed.
+        """
+        t = self.telemetry.clock()
+        rect = None
+        if self.roi is not None:
+            crop, rect = self.roi.crop(frame)
+        else:
+            crop = frame
+        
+        # Convert to RGB (the only color conversion a frame goes through)
+        image = self.rgb_buffer.convert(crop, cv2.COLOR_BGR2RGB)
+        image.flags.writeable = False
+        t = self.telemetry.lap("preprocess", t)
+        
+        if self._first_frame_pending:
+            start = time.perf_counter()
+            results = self.pose.process(image)
+            self.first_frame_s = time.perf_counter() - start
+            self._first_frame_pending = False
+            if self.startup_timings["first_frame_s"] is None:
+                self.startup_timings["first_frame_s"] = self.first_frame_s
+        else:
+            results = self.pose.process(image)
+        image.flags.writeable = True
+        
+        if rect is not None and results.pose_landmarks:
+            self.roi.remap(results.pose_landmarks, rect, frame.shape)
+        landmarks = geometry.landmarks_to_array(results.pose_landmarks, self.landmark_array)
+        if self.roi is not None:
+            # Lost the person: the next frame falls back to full-frame detection
+            self.roi.update(landmarks)
+        self.telemetry.lap("inference", t)
+        return results, landmarks
+    
+    def smooth(self, landmarks, timestamp=None):
+        """Temporally filter a (33, 4) landmark array before counting (a no-op unless smoothing is on)"""
+        if self.smoother is None:
+            return landmarks
+        return self.smoother.update(landmarks, timestamp)
+    
+    def angles_from_landmarks(self, landmarks):
+        """Return (elbow_angle, hip_angle) from a (33, 4) landmark array, or None"""
+        if landmarks is None:
+            return None
+        
+        # Both angles in one vectorized call, from the side the camera sees better
+        elbow_angle, hip_angle = geometry.pushup_angles(landmarks, self.sides)
+        return float(elbow_angle), float(hip_angle)
+    
+    def draw_overlay(self, image, results, angles, stage, count, footer='Press q to quit'):
+        """Draw angles, stage, count, landmarks and a footer line onto a BGR frame in place"""
+        if angles is not None:
+            elbow_angle, hip_angle = angles
+            cv2.putText(image, f'Elbow Angle: {int(elbow_angle)}', 
+                       (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+            cv2.putText(image, f'Hip Angle: {int(hip_angle)}', 
+                       (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+            cv2.putText(image, f'Stage: {stage}', 
+                       (50, 150), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            cv2.putText(image, f'Pushups: {count}', 
+                       (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+        
+        if self.drawing_specs is None:
+            self.drawing_specs = (
+                self.mp_drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2),
+                self.mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2),
+            )
+        self.mp_drawing.draw_landmarks(image, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS,
+                                       *self.drawing_specs)
+        
+        if footer:
+            cv2.putText(image, footer, 
+                       (50, 550), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    
+    def process_frame(self, frame, timestamp=None, frame_index=None, render=None):
+        """One BGR frame through pose, smoothing, angles and counting, with telemetry.
+        
+        Every frame loop (CLI, GUI, pipeline, service) goes through here. render,
+        if given, is called as render(frame, results, angles) before the frame is closed,
+        so drawing and display are charged to the "render" stage.
+        Returns (results, angles, rep): angles is None without a person.
+        """
+        results, landmarks = self.run_pose(frame)
+        t = self.telemetry.clock()
+        landmarks = self.smooth(landmarks, timestamp)
+        angles = self.angles_from_landmarks(landmarks)
+        t = self.telemetry.lap("geometry", t)
+        rep = False
+        if angles is not None:
+            rep = self.counter.update(angles[0], angles[1], timestamp, frame_index)
+            t = self.telemetry.lap("counting", t)
+        if render is not None:
+            render(frame, results, angles)
+            self.telemetry.lap("render", t)
+        self.end_frame(frame_index, landmarks, angles, rep, timestamp)
+        return results, angles, rep
+    
+    def end_frame(self, index, landmarks, angles, rep=False, timestamp=None):
+        """Hand one finished frame to the exporter and telemetry (a no-op when neither is set)"""
+        if self.exporter is not None:
+            self.exporter.append(landmarks, angles, self.stage, rep, timestamp)
+        telemetry = self.telemetry
+        if not telemetry.enabled:
+            return
+        if landmarks is None:
+            telemetry.count("frames_without_landmarks")
+        elif not self.counter.straight:
+            # Counted reps need a straight body: these frames explain most missed reps
+            telemetry.count("frames_not_straight")
+        if rep:
+            telemetry.count("reps")
+        telemetry.end_frame(
+            index,
+            landmarks=landmarks is not None,
+            elbow=None if angles is None else round(angles[0], 1),
+            hip=None if angles is None else round(angles[1], 1),
+            stage=self.stage,
+            count=self.pushup_count,
+        )
+    
     def detect_pushups(self):
         """Main function to detect pushups using webcam"""
         cap = cv2.VideoCapture(0)
@@ -46,122 +263,124 @@ class PushupDetector:
         print("Press 'q' to quit")
         print("Position yourself in front of the camera and start doing pushups...")
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            
-            if not ret:
-                print("Error: Could not read frame")
-                break
-            
-            # Resize frame for better performance
-            frame = cv2.resize(frame, (800, 600))
-            
-            # Convert to RGB
-            image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            image.flags.writeable = False
-            
-            # Make detection
-            results = self.pose.process(image)
-            
-            # Convert back to BGR
-            image.flags.writeable = True
-            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-            
-            # Extract landmarks
-            try:
-                landmarks = results.pose_landmarks.landmark
-                
-                # Get coordinates for pushup detection
-                # Using left side body parts (can be changed to right side)
-                shoulder = [
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y
-                ]
-                elbow = [
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value].y
-                ]
-                wrist = [
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value].y
-                ]
-                hip = [
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y
-                ]
-                knee = [
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].x,
-                    landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].y
-                ]
+        # Frames are decoded and resized into the same buffers every iteration
+        capture_buffer = None
+        display_buffer = np.empty((600, 800, 3), dtype=np.uint8)
+        telemetry = self.telemetry
+        frame_index = 0
+        key = None
+        
+        def show(frame, results, angles):
+            nonlocal key
+            # Angles, stage, count, landmarks and instructions, drawn straight onto the BGR frame
+            self.draw_overlay(frame, results, angles, self.stage, self.pushup_count)
+            cv2.imshow('Pushup Detector', frame)
+            key = cv2.waitKey(10) & 0xFF
+        
+        try:
+            while cap.isOpened():
+                t = telemetry.clock()
+                ret, capture_buffer = cap.read(capture_buffer)
                 
-                # Calculate angles
-                elbow_angle = self.calculate_angle(shoulder, elbow, wrist)
-                hip_angle = self.calculate_angle(shoulder, hip, knee)
+                if not ret:
+                    print("Error: Could not read frame")
+                    break
+                t = telemetry.lap("decode", t)
                 
-                # Pushup counting logic
-                # Check if body is straight (hip angle should be around 180)
-                if hip_angle > 160:  # Body is relatively straight
-                    # Check elbow angle for pushup positions
-                    if elbow_angle > self.angle_threshold_up:
-                        self.stage = "up"
-                    elif elbow_angle < self.angle_threshold_down and self.stage == "up":
-                        self.stage = "down"
-                        self.pushup_count += 1
-                        print(f"Pushup Count: {self.pushup_count}")
+                # Resize frame for better performance
+                frame = resize_into(capture_buffer, (800, 600), display_buffer)
+                telemetry.lap("preprocess", t)
                 
-                # Visualize angles and stage
-                cv2.putText(image, f'Elbow Angle: {int(elbow_angle)}', 
-                           (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                cv2.putText(image, f'Hip Angle: {int(hip_angle)}', 
-                           (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-                cv2.putText(image, f'Stage: {self.stage}', 
-                           (50, 150), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                cv2.putText(image, f'Pushups: {self.pushup_count}', 
-                           (50, 200), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                # Detect, count and display
+                rep = self.process_frame(frame, time.time(), frame_index, show)[2]
+                if rep:
+                    print(f"Pushup Count: {self.pushup_count}")
+                frame_index += 1
                 
-            except Exception as e:
-                # If landmarks are not detected, continue without error
-                pass
-            
-            # Draw landmarks
-            self.mp_drawing.draw_landmarks(
-                image, 
-                results.pose_landmarks, 
-                self.mp_pose.POSE_CONNECTIONS,
-                self.mp_drawing.DrawingSpec(color=(245, 117, 66), thickness=2, circle_radius=2),
-                self.mp_drawing.DrawingSpec(color=(245, 66, 230), thickness=2, circle_radius=2)
-            )
-            
-            # Display instructions
-            cv2.putText(image, 'Press q to quit', 
-                       (50, 550), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            
-            # Display the frame
-            cv2.imshow('Pushup Detector', image)
-            
-            # Break loop on 'q' key press
-            if cv2.waitKey(10) & 0xFF == ord('q'):
-                break
-        
-        # Release resources
-        cap.release()
-        cv2.destroyAllWindows()
+                # Break loop on 'q' key press
+                if key == ord('q'):
+                    break
+        except Exception as e:
+            self.telemetry.error(e, "detect_pushups")
+            raise
+        finally:
+            # Release resources
+            cap.release()
+            cv2.destroyAllWindows()
         
         # Return the final pushup count
         return self.pushup_count
 
 def main():
     """Main function to run the pushup detector"""
-    detector = PushupDetector()
+    parser = argparse.ArgumentParser(description="Real-time pushup detection using a webcam")
+    parser.add_argument("--roi", action="store_true",
+                        help="Run pose on a crop around the tracked person instead of the whole frame")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Run capture, inference and rendering on separate threads")
+    parser.add_argument("--queue-size", type=int, default=2,
+                        help="Frames buffered between pipeline stages (default: 2)")
+    parser.add_argument("--no-drop", action="store_true",
+                        help="Block the camera instead of dropping the oldest queued frame")
+    parser.add_argument("--latency-report", help="Write pipeline latency stats as JSON to this file")
+    parser.add_argument("--warm-up", action="store_true",
+                        help="Run one inference on a blank frame before opening the camera")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="Print import, model and first-frame timings on exit")
+    parser.add_argument("--smooth", action="store_true",
+                        help="One-euro filter landmarks before counting (pairs well with --model-complexity 0)")
+    parser.add_argument("--model-complexity", type=int, choices=(0, 1, 2), default=1,
+                        help="MediaPipe Pose model: 0 lite (fastest), 1 full, 2 heavy (default: 1)")
+    parser.add_argument("--hip-hysteresis", type=float, default=0,
+                        help="Degrees the hip may sag below its threshold once straight (default: 0)")
+    parser.add_argument("--telemetry", help="Append per-frame stage timings and summaries as JSON lines to this file")
+    parser.add_argument("--metrics", help="Keep a Prometheus text-format metrics file updated at this path")
+    parser.add_argument("--export", help="Stream landmarks, angles and rep ranges to this directory (see landmark_export.py)")
+    args = parser.parse_args()
+    
+    telemetry = telemetry_from_paths(args.telemetry, args.metrics)
+    detector = PushupDetector(use_roi=args.roi, smoothing=args.smooth, model_complexity=args.model_complexity,
+                              telemetry=telemetry)
+    detector.counter.hip_hysteresis = args.hip_hysteresis
+    if args.export:
+        detector.exporter = LandmarkExporter(args.export, meta={"source": "camera"})
+    if args.warm_up:
+        detector.warm_up()
     
     print("Starting Pushup Detection...")
     print("Make sure you have good lighting and are visible to the camera")
     print("Position yourself so that your side profile is visible for better detection")
     
     # Run detection
-    final_count = detector.detect_pushups()
+    if args.pipeline:
+        from pipeline import PipelinedDetector
+        
+        pipelined = PipelinedDetector(detector, queue_size=args.queue_size, drop_oldest=not args.no_drop)
+        print("Pushup Detector Started! (pipelined)")
+        print("Press 'q' to quit")
+        final_count = pipelined.run()
+        
+        report = pipelined.report()
+        print("\nLatency per stage (ms):")
+        for stage, values in report["latency_ms"].items():
+            print(f"  {stage:<17} p50 {values['p50']:>7.2f}  p95 {values['p95']:>7.2f}")
+        print(f"Dropped frames: {report['capture_queue_dropped']} before inference, "
+              f"{report['render_queue_dropped']} before render")
+        if args.latency_report:
+            with open(args.latency_report, "w") as f:
+                json.dump(report, f, indent=2)
+    else:
+        final_count = detector.detect_pushups()
+    
+    telemetry.close()
+    if detector.exporter is not None:
+        detector.exporter.close()
     
     print(f"\nFinal Pushup Count: {final_count}")
+    if args.startup_report:
+        print("Startup (ms):")
+        for name, value in detector.startup_report().items():
+            print(f"  {name:<20} {'-' if value is None else value}")
     print("Program ended.")
 
 if __name__ == "__main__":
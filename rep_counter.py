@@ -0,0 +1,172 @@
+import numpy as np
+
+class RepBoundaries:
+    """Frame ranges of reps from a stream of stage changes and rep events.
+
+    A rep runs from the frame the stage turned "up", through the frame it was
+    counted (the bottom, where it turned "down"), to the frame it is "up" again.
+    Only transitions matter, so observe() may be given every frame or just the
+    frames where something changed.
+    """
+    __slots__ = ("reps", "_stage", "_up_start", "_open_rep")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.reps = []  # completed reps
+        self._stage = None
+        self._up_start = None
+        self._open_rep = None
+
+    def observe(self, frame, stage, rep=False, timestamp=None):
+        if stage == "up" and self._stage != "up":
+            if self._open_rep is not None:
+                # Back up: the rep is complete
+                self._open_rep["end_frame"] = frame
+                self._open_rep["end_time"] = timestamp
+                self.reps.append(self._open_rep)
+                self._open_rep = None
+            self._up_start = (frame, timestamp)
+        if rep:
+            start_frame, start_time = self._up_start if self._up_start is not None else (frame, timestamp)
+            self._open_rep = {
+                "rep": len(self.reps) + 1,
+                "start_frame": start_frame,
+                "bottom_frame": frame,
+                "end_frame": None,
+                "start_time": start_time,
+                "bottom_time": timestamp,
+                "end_time": None,
+            }
+        self._stage = stage
+
+    def all(self, last_frame=None, last_time=None):
+        """Completed reps plus one still waiting to return "up", which ends at last_frame"""
+        if self._open_rep is None:
+            return list(self.reps)
+        return self.reps + [dict(self._open_rep, end_frame=last_frame, end_time=last_time)]
+
+class RepCounter:
+    """Streaming pushup state machine driven by elbow and hip angle samples.
+
+    A rep is counted on the transition from "up" (elbow above angle_threshold_up)
+    to "down" (elbow below angle_threshold_down), and only while the body is
+    straight (hip above hip_angle_threshold). NaN samples never change state.
+
+    The elbow thresholds already form a wide hysteresis band; hip_hysteresis adds
+    one to the body check: once straight, the body stays straight until the hip
+    angle drops more than hip_hysteresis degrees below the threshold, so a noisy
+    hip angle hovering at the threshold cannot drop the down sample of a rep.
+
+    Each rep's start, bottom and end frame (and timestamp) is kept in boundaries.
+    Frames are numbered by sample unless update() is given the frame index.
+    """
+    __slots__ = ("angle_threshold_up", "angle_threshold_down", "hip_angle_threshold", "hip_hysteresis",
+                 "count", "stage", "straight", "last_rep_time", "on_rep", "frames_seen", "boundaries")
+
+    def __init__(self, angle_threshold_up=160, angle_threshold_down=90, hip_angle_threshold=160,
+                 on_rep=None, hip_hysteresis=0):
+        self.angle_threshold_up = angle_threshold_up
+        self.angle_threshold_down = angle_threshold_down
+        self.hip_angle_threshold = hip_angle_threshold
+        self.hip_hysteresis = hip_hysteresis
+        # Called as on_rep(count, timestamp) for every counted rep
+        self.on_rep = on_rep
+        self.boundaries = RepBoundaries()
+        self.reset()
+
+    def reset(self):
+        """Forget all progress but keep thresholds and the callback"""
+        self.count = 0
+        self.stage = None  # 'up' or 'down'
+        self.straight = False
+        self.last_rep_time = None
+        self.frames_seen = 0
+        self.boundaries.reset()
+
+    def update(self, elbow_angle, hip_angle, timestamp=None, frame=None):
+        """Advance by one sample; returns True when it completed a rep"""
+        if frame is None:
+            frame = self.frames_seen
+        self.frames_seen = frame + 1
+        
+        # Check if body is straight (hip angle should be around 180)
+        straight = hip_angle > self.hip_angle_threshold
+        if not straight and self.straight:
+            straight = hip_angle > self.hip_angle_threshold - self.hip_hysteresis
+        self.straight = straight
+        if straight:
+            # Check elbow angle for pushup positions
+            if elbow_angle > self.angle_threshold_up:
+                if self.stage != "up":
+                    self.boundaries.observe(frame, "up", False, timestamp)
+                self.stage = "up"
+            elif elbow_angle < self.angle_threshold_down and self.stage == "up":
+                self.stage = "down"
+                self.count += 1
+                self.last_rep_time = timestamp
+                self.boundaries.observe(frame, "down", True, timestamp)
+                if self.on_rep is not None:
+                    self.on_rep(self.count, timestamp)
+                return True
+        return False
+
+    def feed(self, elbow_angles, hip_angles, timestamps=None):
+        """Advance by a whole array of samples at once; returns indices of the samples that completed reps.
+
+        Equivalent to calling update() on each sample in order, but vectorized:
+        the stage only changes on "up" or "down" samples, so a rep is any down
+        sample whose preceding up/down sample was an up.
+        """
+        elbow_angles = np.asarray(elbow_angles)
+        hip_angles = np.asarray(hip_angles)
+
+        straight = hip_angles > self.hip_angle_threshold
+        if self.hip_hysteresis:
+            straight = self._latch(straight, hip_angles > self.hip_angle_threshold - self.hip_hysteresis)
+        if straight.size:
+            self.straight = bool(straight[-1])
+        up = straight & (elbow_angles > self.angle_threshold_up)
+        down = straight & (elbow_angles < self.angle_threshold_down) & ~up
+
+        first_frame = self.frames_seen
+        self.frames_seen += len(elbow_angles)
+        event_indices = np.flatnonzero(up | down)
+        if event_indices.size == 0:
+            return event_indices
+
+        is_up = up[event_indices]
+        previous_up = np.empty_like(is_up)
+        previous_up[0] = self.stage == "up"
+        previous_up[1:] = is_up[:-1]
+        rep_indices = event_indices[~is_up & previous_up]
+
+        # Rep boundaries only depend on entering "up" and on reps, so replay just those
+        up_entries = event_indices[is_up & ~previous_up]
+        for index in np.union1d(up_entries, rep_indices).tolist():
+            timestamp = float(timestamps[index]) if timestamps is not None else None
+            is_rep = not up[index]
+            self.boundaries.observe(first_frame + index, "down" if is_rep else "up", is_rep, timestamp)
+
+        if is_up[-1]:
+            self.stage = "up"
+        elif rep_indices.size:
+            self.stage = "down"
+
+        if rep_indices.size:
+            first_count = self.count + 1
+            self.count += int(rep_indices.size)
+            if timestamps is not None:
+                self.last_rep_time = timestamps[rep_indices[-1]]
+            if self.on_rep is not None:
+                for count, index in enumerate(rep_indices.tolist(), start=first_count):
+                    self.on_rep(count, timestamps[index] if timestamps is not None else None)
+        return rep_indices
+
+    def _latch(self, enter, stay):
+        """Vectorized hysteresis: True from an enter sample until the first sample that is not stay"""
+        decided = enter | ~stay
+        # Index of the latest deciding sample at or before each sample (-1 before the first)
+        last = np.maximum.accumulate(np.where(decided, np.arange(enter.size), -1))
+        return np.where(last >= 0, enter[np.maximum(last, 0)], self.straight)
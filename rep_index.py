@@ -0,0 +1,166 @@
+import argparse
+import json
+import os
+import sys
+
+from lazy_imports import LazyModule
+
+cv2 = LazyModule("cv2")
+
+THUMBNAIL_WIDTH = 320
+
+class RepIndex:
+    """Rep boundaries of one video, for jumping straight to any rep.
+
+    Built from a batch_processor.py or server result ({"video", "reps", "video_fps"});
+    each rep has start, bottom and end frame indices (see rep_counter.RepBoundaries).
+    Seeking sets CAP_PROP_POS_FRAMES, so reaching a rep costs one seek plus decoding
+    from the nearest keyframe, not decoding every frame before it.
+    """
+    def __init__(self, video_path, reps, fps=None):
+        self.video_path = video_path
+        self.reps = reps
+        self.fps = fps
+
+    @classmethod
+    def from_result(cls, result):
+        return cls(result["video"], result.get("reps", []), result.get("video_fps") or None)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["video"], data["reps"], data.get("fps"))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"video": self.video_path, "fps": self.fps, "reps": self.reps}, f, indent=1)
+
+    def __len__(self):
+        return len(self.reps)
+
+    def rep(self, number):
+        """Boundaries of rep `number` (1-based)"""
+        return self.reps[number - 1]
+
+    def seek(self, cap, number, position="start"):
+        """Point cap at rep `number`'s "start", "bottom" or "end" frame; returns the frame index"""
+        frame = self.rep(number)[f"{position}_frame"]
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+        return frame
+
+    def open(self):
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise IOError(f"Could not open video file {self.video_path}")
+        return cap
+
+def _save_thumbnail(frame, out_path, width=THUMBNAIL_WIDTH):
+    height = round(frame.shape[0] * width / frame.shape[1])
+    return cv2.imwrite(out_path, cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA))
+
+def _seek_to(cap, frame):
+    """Set the read position unless cap is already there (e.g. the previous rep ended right before)"""
+    if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame)
+
+def write_thumbnail(cap, index, number, out_path, width=THUMBNAIL_WIDTH):
+    """Save the bottom frame of a rep as an image; returns False if it could not be read"""
+    _seek_to(cap, index.rep(number)["bottom_frame"])
+    ret, frame = cap.read()
+    if not ret:
+        return False
+    return _save_thumbnail(frame, out_path, width)
+
+def write_clip(cap, index, number, out_path, padding_frames=0, fourcc="mp4v", thumbnail_path=None):
+    """Decode only a rep's frame range (plus padding) and write it as a clip.
+
+    With thumbnail_path the bottom frame is saved on the way, so a rep costs one
+    seek. Returns (frames written, thumbnail written).
+    """
+    info = index.rep(number)
+    start = max(info["start_frame"] - padding_frames, 0)
+    stop = info["end_frame"] + padding_frames
+    _seek_to(cap, start)
+
+    fps = index.fps or cap.get(cv2.CAP_PROP_FPS) or 30.0
+    writer = None
+    written = 0
+    thumbnail = False
+    frame = None
+    try:
+        for position in range(start, stop + 1):
+            ret, frame = cap.read(frame)
+            if not ret:
+                break
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+            writer.write(frame)
+            written += 1
+            if thumbnail_path and position == info["bottom_frame"]:
+                thumbnail = _save_thumbnail(frame, thumbnail_path)
+    finally:
+        if writer is not None:
+            writer.release()
+    return written, thumbnail
+
+def extract_reps(index, out_dir, clips=True, thumbnails=True, padding_frames=0):
+    """Write <video>_rep<n>.mp4 / .jpg for every rep; returns the paths written"""
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(index.video_path))[0]
+    written = []
+    cap = index.open()
+    try:
+        # Reps are visited in order and each is decoded front to back, so seeks only go forward
+        # (padding can overlap the previous clip by a few frames)
+        for number in range(1, len(index) + 1):
+            base = os.path.join(out_dir, f"{stem}_rep{number:03d}")
+            if clips:
+                frames, thumbnail = write_clip(cap, index, number, base + ".mp4", padding_frames,
+                                               thumbnail_path=base + ".jpg" if thumbnails else None)
+                if thumbnail:
+                    written.append(base + ".jpg")
+                if frames:
+                    written.append(base + ".mp4")
+            elif thumbnails and write_thumbnail(cap, index, number, base + ".jpg"):
+                written.append(base + ".jpg")
+    finally:
+        cap.release()
+    return written
+
+def main():
+    """Command line entry point: per-rep clips and thumbnails from batch results"""
+    parser = argparse.ArgumentParser(description="Cut per-rep clips and thumbnails using the rep index of a batch run")
+    parser.add_argument("results", help="JSON lines written by batch_processor.py -o")
+    parser.add_argument("-o", "--out-dir", default="reps", help="Directory for clips and thumbnails (default: reps)")
+    parser.add_argument("--no-clips", action="store_true", help="Only write thumbnails")
+    parser.add_argument("--no-thumbnails", action="store_true", help="Only write clips")
+    parser.add_argument("--padding", type=int, default=0, help="Extra frames before and after each rep (default: 0)")
+    parser.add_argument("--video", help="Only process results for this video path")
+    args = parser.parse_args()
+
+    failed = 0
+    total = 0
+    with open(args.results) as f:
+        for line in f:
+            result = json.loads(line)
+            if result.get("error") or not result.get("reps"):
+                continue
+            if args.video and os.path.abspath(result["video"]) != os.path.abspath(args.video):
+                continue
+            index = RepIndex.from_result(result)
+            try:
+                written = extract_reps(index, args.out_dir, not args.no_clips, not args.no_thumbnails, args.padding)
+            except IOError as e:
+                print(f"Error: {e}")
+                failed += 1
+                continue
+            total += len(index)
+            print(f"{index.video_path}: {len(index)} reps, {len(written)} files")
+
+    print(f"Extracted {total} reps into {args.out_dir}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import numpy as np
+
+class RoiTracker:
+    """Tracks a padded bounding box around the athlete so pose runs on a crop.
+
+    The box comes from the previous frame's landmarks (full-frame normalized
+    coordinates). It is only recomputed when the person drifts close to its edge,
+    which keeps the crop steady for MediaPipe's own frame-to-frame tracking.
+    When no person is found the tracker resets and the next frame is full-frame.
+    """
+    def __init__(self, padding=0.3, min_size=0.25, edge_margin=0.1, min_visibility=0.5):
+        self.padding = padding  # Padding on each side, as a fraction of the body box size
+        self.min_size = min_size  # Smallest crop side, as a fraction of the frame
+        self.edge_margin = edge_margin  # Re-center when landmarks get this close to the crop edge
+        self.min_visibility = min_visibility
+        self.box = None  # (x0, y0, x1, y1), normalized; None means full frame
+
+    def reset(self):
+        self.box = None
+
+    def seed(self, box):
+        """Start from a detected person box (x0, y0, x1, y1, normalized) instead of the full frame"""
+        x0, x1 = self._span(box[0], box[2])
+        y0, y1 = self._span(box[1], box[3])
+        self.box = (x0, y0, x1, y1)
+
+    def crop(self, frame):
+        """Return (view of the frame to run pose on, (x0, y0, width, height) in pixels)"""
+        height, width = frame.shape[:2]
+        if self.box is None:
+            return frame, (0, 0, width, height)
+        x0, y0, x1, y1 = self.box
+        px0, py0 = int(x0 * width), int(y0 * height)
+        px1, py1 = int(np.ceil(x1 * width)), int(np.ceil(y1 * height))
+        # Slicing gives a view: no pixels are copied until color conversion
+        return frame[py0:py1, px0:px1], (px0, py0, px1 - px0, py1 - py0)
+
+    def remap(self, pose_landmarks, rect, frame_shape):
+        """Convert landmarks from crop coordinates to full-frame coordinates in place"""
+        x0, y0, crop_width, crop_height = rect
+        height, width = frame_shape[:2]
+        if (crop_width, crop_height) == (width, height):
+            return
+        scale_x, scale_y = crop_width / width, crop_height / height
+        offset_x, offset_y = x0 / width, y0 / height
+        for lm in pose_landmarks.landmark:
+            lm.x = lm.x * scale_x + offset_x
+            lm.y = lm.y * scale_y + offset_y
+            # z uses the same scale as x
+            lm.z = lm.z * scale_x
+
+    def update(self, landmarks):
+        """Pick the crop for the next frame from this frame's (33, 4) landmark array (or None)"""
+        if landmarks is None:
+            self.box = None
+            return
+
+        visible = landmarks[landmarks[:, 3] >= self.min_visibility]
+        if len(visible) < 4:
+            self.box = None
+            return
+
+        bx0, by0 = visible[:, 0].min(), visible[:, 1].min()
+        bx1, by1 = visible[:, 0].max(), visible[:, 1].max()
+
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            margin_x = (x1 - x0) * self.edge_margin
+            margin_y = (y1 - y0) * self.edge_margin
+            if (bx0 >= x0 + margin_x and bx1 <= x1 - margin_x and
+                    by0 >= y0 + margin_y and by1 <= y1 - margin_y):
+                # Still comfortably inside: keep the crop steady
+                return
+
+        x0, x1 = self._span(bx0, bx1)
+        y0, y1 = self._span(by0, by1)
+        self.box = (x0, y0, x1, y1)
+
+    def _span(self, low, high):
+        """Pad [low, high] and clamp it to [0, 1] with at least min_size length"""
+        center = (low + high) / 2.0
+        half = max((high - low) * (0.5 + self.padding), self.min_size / 2.0)
+        low, high = center - half, center + half
+        if low < 0.0:
+            low, high = 0.0, min(1.0, high - low)
+        if high > 1.0:
+            low, high = max(0.0, low - (high - 1.0)), 1.0
+        return float(low), float(high)
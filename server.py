@@ -0,0 +1,258 @@
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+from aiohttp import WSMsgType, web
+
+from detector_pool import DetectorPool, PoolBusy
+from frame_buffers import resize_into
+
+FRAME_SIZE = (800, 600)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+def count_video_file(detector, video_path, on_rep=None):
+    """Blocking: count pushups in a video file; on_rep(count, timestamp) fires as reps happen"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return {"error": "Could not open video file"}
+
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    rep_timestamps = []
+
+    def record_rep(count, timestamp):
+        rep_timestamps.append(None if timestamp is None else round(timestamp, 3))
+        if on_rep is not None:
+            on_rep(count, timestamp)
+
+    detector.counter.on_rep = record_rep
+    frame_count = 0
+    capture_buffer = None
+    resize_buffer = np.empty((FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+    start = time.perf_counter()
+
+    while True:
+        ret, capture_buffer = cap.read(capture_buffer)
+        if not ret:
+            break
+        timestamp = frame_count / video_fps if video_fps > 0 else None
+        detector.process_frame(resize_into(capture_buffer, FRAME_SIZE, resize_buffer), timestamp, frame_count)
+        frame_count += 1
+
+    cap.release()
+    elapsed = time.perf_counter() - start
+    last_frame = frame_count - 1
+    return {
+        "pushup_count": detector.pushup_count,
+        "rep_timestamps": rep_timestamps,
+        # Start, bottom and end frame of every rep (see rep_index.py)
+        "reps": detector.counter.boundaries.all(last_frame, last_frame / video_fps if video_fps > 0 else None),
+        "frames_processed": frame_count,
+        "video_fps": round(video_fps, 3),
+        "processing_fps": round(frame_count / elapsed, 2) if elapsed > 0 else 0.0,
+        "first_frame_ms": None if detector.first_frame_s is None else round(detector.first_frame_s * 1000, 2),
+    }
+
+def process_jpeg(detector, data, timestamp):
+    """Blocking: decode one JPEG frame and advance the detector; returns (ok, pose found, reps)"""
+    if not data:
+        # imdecode raises on an empty buffer instead of returning None
+        return False, False, []
+    frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return False, False, []
+    reps = []
+    detector.counter.on_rep = lambda count, ts: reps.append({"type": "rep", "count": count, "timestamp": ts})
+    angles = detector.process_frame(frame, timestamp)[1]
+    return True, angles is not None, reps
+
+async def _save_upload(request):
+    """Stream the request body (raw or multipart field "video") to a temp file"""
+    if request.content_type.startswith("multipart/"):
+        reader = await request.multipart()
+        part = await reader.next()
+        while part is not None and part.name != "video":
+            part = await reader.next()
+        if part is None:
+            raise web.HTTPBadRequest(text="Missing multipart field 'video'")
+        read_chunk = part.read_chunk
+    else:
+        read_chunk = request.content.read
+
+    fd, path = tempfile.mkstemp(suffix=".video")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await read_chunk(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+async def _run_guarded(pool, func, *args):
+    """pool.run that, if the handler is cancelled, still waits for the pose thread before giving up.
+
+    Handlers release the detector (and delete uploads) in finally blocks; without
+    this a cancelled handler would hand out a detector another thread is still using.
+    """
+    job = asyncio.ensure_future(pool.run(func, *args))
+    try:
+        return await asyncio.shield(job)
+    except asyncio.CancelledError:
+        await asyncio.wait([job])
+        raise
+
+def _busy_response():
+    return web.json_response({"error": "Server busy, retry later"}, status=503, headers={"Retry-After": "1"})
+
+async def handle_video(request):
+    """POST /videos: count pushups in an uploaded video.
+
+    Returns the final result as JSON. With ?live=1 the response is newline
+    delimited JSON: one {"type": "rep"} line per rep as it is counted, then
+    a {"type": "result"} line.
+    """
+    pool = request.app["pool"]
+    # Refuse before reading a large body we could not process anyway
+    if pool.busy():
+        return _busy_response()
+    path = await _save_upload(request)
+    try:
+        try:
+            detector = await pool.acquire()
+        except PoolBusy:
+            return _busy_response()
+
+        job = None
+        try:
+            if request.query.get("live") not in ("1", "true"):
+                result = await _run_guarded(pool, count_video_file, detector, path)
+                return web.json_response(result, status=400 if "error" in result else 200)
+
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            loop = asyncio.get_running_loop()
+            events = asyncio.Queue()
+
+            def on_rep(count, timestamp):
+                # Called on the pose thread: hand the event to the event loop
+                loop.call_soon_threadsafe(events.put_nowait, {"type": "rep", "count": count, "timestamp": timestamp})
+
+            job = asyncio.ensure_future(pool.run(count_video_file, detector, path, on_rep))
+            while not (job.done() and events.empty()):
+                try:
+                    event = await asyncio.wait_for(events.get(), timeout=0.1)
+                except asyncio.TimeoutError:
+                    continue
+                await response.write((json.dumps(event) + "\n").encode())
+            result = dict(job.result(), type="result")
+            await response.write((json.dumps(result) + "\n").encode())
+            await response.write_eof()
+            return response
+        finally:
+            if job is not None and not job.done():
+                # The client went away mid-stream: the pose thread still owns the detector (and the file)
+                await asyncio.wait([job])
+            pool.release(detector)
+    finally:
+        os.remove(path)
+
+async def handle_websocket(request):
+    """GET /ws: stream JPEG frames as binary messages and receive rep events live.
+
+    Text messages control the session: {"type": "reset"} zeroes the count and
+    {"type": "end"} asks for a {"type": "summary"} message and closes. With
+    ?acks=1 every frame is answered with a {"type": "frame"} message, which
+    clients can use to pace their sending.
+    """
+    pool = request.app["pool"]
+    ws = web.WebSocketResponse(max_msg_size=16 * 1024 * 1024)
+    await ws.prepare(request)
+
+    try:
+        detector = await pool.acquire()
+    except PoolBusy:
+        # 1013: try again later
+        await ws.close(code=1013, message=b"Server busy")
+        return ws
+
+    send_acks = request.query.get("acks") in ("1", "true")
+    session_start = time.perf_counter()
+    frame_index = 0
+    try:
+        # Each frame is processed before the next is read, so a fast client is
+        # slowed down by TCP flow control instead of queuing frames in memory
+        async for msg in ws:
+            if msg.type == WSMsgType.BINARY:
+                timestamp = round(time.perf_counter() - session_start, 3)
+                ok, pose_found, reps = await _run_guarded(pool, process_jpeg, detector, msg.data, timestamp)
+                for event in reps:
+                    await ws.send_json(event)
+                if not ok:
+                    await ws.send_json({"type": "error", "index": frame_index, "error": "Could not decode frame"})
+                elif send_acks:
+                    await ws.send_json({"type": "frame", "index": frame_index, "pose": pose_found,
+                                        "count": detector.pushup_count, "stage": detector.stage})
+                frame_index += 1
+            elif msg.type == WSMsgType.TEXT:
+                try:
+                    command = json.loads(msg.data).get("type")
+                except (ValueError, AttributeError):
+                    command = None
+                if command == "reset":
+                    detector.counter.reset()
+                elif command == "end":
+                    await ws.send_json({"type": "summary", "pushup_count": detector.pushup_count,
+                                        "frames_processed": frame_index})
+                    await ws.close()
+                else:
+                    await ws.send_json({"type": "error", "error": "Unknown command"})
+            elif msg.type == WSMsgType.ERROR:
+                break
+    finally:
+        pool.release(detector)
+    return ws
+
+async def handle_health(request):
+    """GET /health: detector pool occupancy"""
+    return web.json_response({"status": "ok", "pool": request.app["pool"].stats()})
+
+def create_app(pool_size=2, max_waiting=8, max_upload_mb=512):
+    """Build the aiohttp application (also usable with aiohttp's test client)"""
+    app = web.Application(client_max_size=max_upload_mb * 1024 ** 2)
+    app["pool"] = DetectorPool(pool_size, max_waiting)
+
+    async def start_pool(app):
+        await app["pool"].start()
+
+    async def close_pool(app):
+        await app["pool"].close()
+
+    app.on_startup.append(start_pool)
+    app.on_cleanup.append(close_pool)
+    app.router.add_post("/videos", handle_video)
+    app.router.add_get("/ws", handle_websocket)
+    app.router.add_get("/health", handle_health)
+    return app
+
+def main():
+    """Command line entry point for the rep counting service"""
+    parser = argparse.ArgumentParser(description="HTTP/WebSocket pushup counting service")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--pool-size", type=int, default=2, help="Pre-warmed detectors (default: 2)")
+    parser.add_argument("--max-waiting", type=int, default=8,
+                        help="Requests allowed to queue for a detector before returning 503 (default: 8)")
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.pool_size, args.max_waiting), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import json
+import os
+import threading
+import time
+import traceback
+from collections import deque
+
+import numpy as np
+
+STAGES = ("decode", "preprocess", "inference", "geometry", "counting", "render")
+
+class Telemetry:
+    """Per-frame stage timers and event counters for a detection loop.
+
+    The loop brackets each stage with clock()/lap() (laps of the same stage add
+    up within a frame) and calls end_frame() once per frame. Every finished frame
+    goes to the sinks' frame() method, and a snapshot with counters and rolling
+    p50/p95 per stage goes to summary() every flush_interval seconds and on close().
+    One instance belongs to one loop (one thread); counters may be bumped from anywhere.
+    """
+    enabled = True
+
+    def __init__(self, sinks=(), window=1000, flush_interval=10.0):
+        self.sinks = list(sinks)
+        self.flush_interval = flush_interval
+        self.samples = {name: deque(maxlen=window) for name in STAGES}
+        self.totals = {name: [0.0, 0] for name in STAGES}  # seconds, frames
+        self.counters = {"frames": 0, "frames_without_landmarks": 0, "frames_not_straight": 0,
+                         "reps": 0, "errors": 0}
+        self._frame = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.perf_counter()
+
+    def clock(self):
+        return time.perf_counter()
+
+    def lap(self, stage, start):
+        """Charge the time since start to stage; returns now, the start of the next lap"""
+        now = time.perf_counter()
+        self._frame[stage] = self._frame.get(stage, 0.0) + (now - start)
+        return now
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def end_frame(self, index=None, **fields):
+        """Close the current frame: record stage times and hand a frame record to the sinks"""
+        stages, self._frame = self._frame, {}
+        with self._lock:
+            self.counters["frames"] += 1
+            for name, seconds in stages.items():
+                self.samples[name].append(seconds)
+                total = self.totals[name]
+                total[0] += seconds
+                total[1] += 1
+
+        if self.sinks:
+            record = {"type": "frame", "frame": index, "t": round(time.time(), 3),
+                      "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in stages.items()}}
+            record.update(fields)
+            for sink in self.sinks:
+                sink.frame(record)
+            if time.perf_counter() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def error(self, exc, where):
+        """Count an exception and log it with its traceback instead of losing it"""
+        self.count("errors")
+        record = {"type": "error", "where": where, "t": round(time.time(), 3),
+                  "error": f"{type(exc).__name__}: {exc}",
+                  "traceback": "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))}
+        for sink in self.sinks:
+            sink.frame(record)
+
+    def snapshot(self):
+        """Counters plus per-stage {p50_ms, p95_ms, mean_ms} over the window and lifetime totals"""
+        with self._lock:
+            counters = dict(self.counters)
+            stages = {}
+            for name in STAGES:
+                values = self.samples[name]
+                if not values:
+                    continue
+                data = np.fromiter(values, dtype=np.float64) * 1000
+                stages[name] = {
+                    "p50_ms": round(float(np.percentile(data, 50)), 3),
+                    "p95_ms": round(float(np.percentile(data, 95)), 3),
+                    "mean_ms": round(float(data.mean()), 3),
+                    "total_s": round(self.totals[name][0], 6),
+                    "frames": self.totals[name][1],
+                }
+        return {"type": "summary", "t": round(time.time(), 3), "counters": counters, "stages": stages}
+
+    def flush(self):
+        self._last_flush = time.perf_counter()
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            sink.summary(snapshot)
+
+    def close(self):
+        self.flush()
+        for sink in self.sinks:
+            sink.close()
+
+class NullTelemetry:
+    """Telemetry that records nothing; the default, so instrumented loops cost a few no-op calls"""
+    enabled = False
+
+    def clock(self):
+        return 0.0
+
+    def lap(self, stage, start):
+        return 0.0
+
+    def count(self, name, amount=1):
+        pass
+
+    def end_frame(self, index=None, **fields):
+        pass
+
+    def error(self, exc, where):
+        pass
+
+    def snapshot(self):
+        return None
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+NULL_TELEMETRY = NullTelemetry()
+
+class JsonLinesSink:
+    """Writes one JSON object per frame (optional), error and summary"""
+    def __init__(self, path, frames=True):
+        self.file = open(path, "a")
+        self.frames = frames
+
+    def frame(self, record):
+        if record["type"] != "frame":
+            # Errors are rare and matter most right before a crash
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+        elif self.frames:
+            self.file.write(json.dumps(record) + "\n")
+
+    def summary(self, snapshot):
+        self.file.write(json.dumps(snapshot) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class PrometheusSink:
+    """Rewrites a Prometheus text-format file on every summary (e.g. for node_exporter's textfile collector)"""
+    def __init__(self, path, prefix="pushup"):
+        self.path = path
+        self.prefix = prefix
+
+    def frame(self, record):
+        pass
+
+    def summary(self, snapshot):
+        lines = []
+        for name, value in snapshot["counters"].items():
+            metric = f"{self.prefix}_{name}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+
+        metric = f"{self.prefix}_stage_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for stage, stats in snapshot["stages"].items():
+            lines.append(f'{metric}{{stage="{stage}",quantile="0.5"}} {stats["p50_ms"] / 1000:.6f}')
+            lines.append(f'{metric}{{stage="{stage}",quantile="0.95"}} {stats["p95_ms"] / 1000:.6f}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {stats["total_s"]:.6f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {stats["frames"]}')
+
+        # Write then rename so scrapers never read a half-written file
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        pass
+
+def telemetry_from_paths(jsonl_path=None, prometheus_path=None, frames=True):
+    """Telemetry writing to the given files, or NULL_TELEMETRY when neither is set"""
+    sinks = []
+    if jsonl_path:
+        sinks.append(JsonLinesSink(jsonl_path, frames))
+    if prometheus_path:
+        sinks.append(PrometheusSink(prometheus_path))
+    return Telemetry(sinks) if sinks else NULL_TELEMETRY
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import benchmark
+import geometry
+
+def flickering_landmarks(rng, num_frames, nan_fraction=0.05):
+    """Synthetic stream whose left and right visibilities hover around each other, with NaN gaps"""
+    landmarks = benchmark.synthetic_landmarks(num_frames, noise=0.01, seed=int(rng.integers(1000)))
+    left = geometry.PUSHUP_SIDE_JOINTS[0]
+    right = geometry.PUSHUP_SIDE_JOINTS[1]
+    # The right side is drawn mirrored so the two sides give different angles
+    landmarks[:, right, 0] = 1.0 - landmarks[:, right, 0]
+    lead = np.repeat(rng.normal(0.0, 0.1, size=num_frames), rng.integers(1, 6, size=num_frames))[:num_frames]
+    landmarks[:, left, 3] = (0.8 + lead)[:, None]
+    landmarks[:, right, 3] = (0.8 - lead + rng.normal(0.0, 0.02, size=num_frames))[:, None]
+    landmarks[rng.random(num_frames) < nan_fraction] = np.nan
+    return landmarks
+
+@pytest.mark.parametrize("seed", range(10))
+def test_batched_angles_match_streaming(seed):
+    rng = np.random.default_rng(seed)
+    landmarks = flickering_landmarks(rng, 300)
+
+    sides = geometry.SideSelector()
+    expected = np.array([geometry.pushup_angles(row, sides) for row in landmarks])
+
+    batched = geometry.SideSelector()
+    bounds = [0] + sorted(rng.choice(np.arange(1, 300), size=3, replace=False).tolist()) + [300]
+    actual = np.concatenate([geometry.pushup_angles(landmarks[start:stop], batched)
+                             for start, stop in zip(bounds, bounds[1:])])
+
+    np.testing.assert_array_equal(actual, expected)
+    assert batched.right == sides.right
+
+def test_side_needs_margin_to_switch():
+    landmarks = benchmark.synthetic_landmarks(4)
+    landmarks[:, geometry.PUSHUP_SIDE_JOINTS[0], 3] = [[0.85], [1.0], [0.8], [0.95]]
+    landmarks[:, geometry.PUSHUP_SIDE_JOINTS[1], 3] = [[0.9], [0.95], [0.9], [0.8]]
+    # Right leads on the first frame; a left lead of 0.05 keeps it, a lead of 0.15 switches
+    assert geometry.SideSelector(margin=0.1).select(landmarks).tolist() == [True, True, True, False]
+    # Without a margin every frame takes the better side
+    assert geometry.SideSelector(margin=0.0).select(landmarks).tolist() == [True, False, True, False]
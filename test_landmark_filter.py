@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+import benchmark
+import geometry
+from landmark_filter import OneEuroFilter
+from rep_counter import RepCounter
+
+NUM_FRAMES = 900  # 30 s at 30 fps, 20 reps
+
+def count_reps(landmarks):
+    angles = geometry.pushup_angles(landmarks)
+    return RepCounter().feed(angles[:, 0], angles[:, 1], np.arange(len(landmarks)) / 30.0).size
+
+def test_smoothing_fixes_noisy_count():
+    landmarks = benchmark.synthetic_landmarks(NUM_FRAMES, noise=0.04)
+    expected = benchmark.expected_reps(NUM_FRAMES)
+    assert count_reps(landmarks) >= expected + 10
+    assert count_reps(OneEuroFilter().smooth_sequence(landmarks)) == expected
+
+@pytest.mark.parametrize("seed", range(1, 6))
+def test_smoothing_stays_within_one_rep(seed):
+    landmarks = benchmark.synthetic_landmarks(NUM_FRAMES, noise=0.04, seed=seed)
+    expected = benchmark.expected_reps(NUM_FRAMES)
+    assert abs(count_reps(OneEuroFilter().smooth_sequence(landmarks)) - expected) <= 1
+
+def test_smoothing_keeps_clean_count():
+    landmarks = benchmark.synthetic_landmarks(NUM_FRAMES)
+    assert count_reps(OneEuroFilter().smooth_sequence(landmarks)) == benchmark.expected_reps(NUM_FRAMES)
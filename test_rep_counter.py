@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from rep_counter import RepCounter
+
+def random_angles(rng, num_samples, nan_fraction=0.05):
+    """Elbow and hip angles in runs around the thresholds, with NaN gaps (frames without a person)"""
+    run_lengths = rng.integers(1, 8, size=num_samples)
+    elbow_levels = rng.choice([60.0, 89.0, 91.0, 120.0, 159.0, 161.0, 175.0], size=num_samples)
+    elbow = np.repeat(elbow_levels, run_lengths)[:num_samples] + rng.normal(0.0, 1.0, size=num_samples)
+    # Hip hovers around the 160 degree threshold so hysteresis matters
+    hip = 160.0 + rng.normal(0.0, 8.0, size=num_samples)
+    elbow[rng.random(num_samples) < nan_fraction] = np.nan
+    hip[rng.random(num_samples) < nan_fraction] = np.nan
+    return elbow, hip
+
+def run_update(elbow, hip, timestamps, hip_hysteresis):
+    events = []
+    counter = RepCounter(hip_hysteresis=hip_hysteresis, on_rep=lambda count, ts: events.append((count, ts)))
+    reps = [index for index, sample in enumerate(zip(elbow.tolist(), hip.tolist(), timestamps.tolist()))
+            if counter.update(*sample)]
+    return counter, reps, events
+
+def run_feed(elbow, hip, timestamps, hip_hysteresis, splits):
+    events = []
+    counter = RepCounter(hip_hysteresis=hip_hysteresis, on_rep=lambda count, ts: events.append((count, float(ts))))
+    reps = []
+    bounds = [0] + sorted(splits) + [len(elbow)]
+    for start, stop in zip(bounds, bounds[1:]):
+        indices = counter.feed(elbow[start:stop], hip[start:stop], timestamps[start:stop])
+        reps += (indices + start).tolist()
+    return counter, reps, events
+
+def assert_same_state(expected, actual):
+    assert actual.count == expected.count
+    assert actual.stage == expected.stage
+    assert actual.straight == expected.straight
+    assert actual.frames_seen == expected.frames_seen
+    assert actual.last_rep_time == expected.last_rep_time
+    last = expected.frames_seen - 1
+    assert actual.boundaries.all(last, float(last)) == expected.boundaries.all(last, float(last))
+
+@pytest.mark.parametrize("hip_hysteresis", [0, 10])
+@pytest.mark.parametrize("seed", range(20))
+def test_feed_matches_update(seed, hip_hysteresis):
+    rng = np.random.default_rng(seed)
+    num_samples = 400
+    elbow, hip = random_angles(rng, num_samples)
+    timestamps = np.arange(num_samples, dtype=np.float64)
+    splits = rng.choice(np.arange(1, num_samples), size=int(rng.integers(0, 6)), replace=False).tolist()
+
+    expected, expected_reps, expected_events = run_update(elbow, hip, timestamps, hip_hysteresis)
+    actual, actual_reps, actual_events = run_feed(elbow, hip, timestamps, hip_hysteresis, splits)
+
+    assert expected.count > 0
+    assert actual_reps == expected_reps
+    assert actual_events == expected_events
+    assert_same_state(expected, actual)
+
+def test_feed_empty_chunk_keeps_state():
+    counter = RepCounter()
+    counter.feed([170.0, 80.0], [175.0, 175.0])
+    counter.feed([], [])
+    assert counter.count == 1
+    assert counter.stage == "down"
+    assert counter.frames_seen == 2
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+import cv2
+import numpy as np
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import server
+from detector_pool import DetectorPool
+
+NUM_FRAMES = 12
+
+@pytest.fixture(scope="module")
+def video_bytes(tmp_path_factory):
+    """A short MJPG .avi (no person in it, so counts are 0)"""
+    path = str(tmp_path_factory.mktemp("videos") / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (320, 240))
+    for i in range(NUM_FRAMES):
+        writer.write(np.full((240, 320, 3), 8 * i, dtype=np.uint8))
+    writer.release()
+    with open(path, "rb") as f:
+        return f.read()
+
+def run_with_client(scenario, **app_options):
+    async def main():
+        async with TestClient(TestServer(server.create_app(**app_options))) as client:
+            return await scenario(client)
+    return asyncio.run(main())
+
+def test_upload_counts_video(video_bytes):
+    async def scenario(client):
+        response = await client.post("/videos", data=video_bytes)
+        assert response.status == 200
+        result = await response.json()
+        assert result["frames_processed"] == NUM_FRAMES
+        assert result["pushup_count"] == 0
+        assert result["reps"] == []
+        # The detector is reset on the pose thread before it is free again
+        for _ in range(100):
+            health = await (await client.get("/health")).json()
+            if health["pool"]["free"] == 1:
+                break
+            await asyncio.sleep(0.02)
+        assert health["pool"]["free"] == 1
+    run_with_client(scenario, pool_size=1)
+
+def test_live_upload_ends_with_result(video_bytes):
+    async def scenario(client):
+        response = await client.post("/videos?live=1", data=video_bytes)
+        assert response.status == 200
+        lines = (await response.text()).splitlines()
+        assert '"type": "result"' in lines[-1]
+    run_with_client(scenario, pool_size=1)
+
+def test_busy_pool_returns_503(video_bytes):
+    async def scenario(client):
+        # An open WebSocket session holds the only detector
+        ws = await client.ws_connect("/ws")
+        await ws.send_json({"type": "reset"})
+        await ws.send_json({"type": "bogus"})
+        # The unknown command's reply proves the session (and its detector) is active
+        assert (await ws.receive_json())["type"] == "error"
+        response = await client.post("/videos", data=video_bytes)
+        assert response.status == 503
+        assert response.headers["Retry-After"] == "1"
+        await ws.close()
+    run_with_client(scenario, pool_size=1, max_waiting=0)
+
+def test_websocket_session():
+    _, jpeg = cv2.imencode(".jpg", np.zeros((240, 320, 3), dtype=np.uint8))
+
+    async def scenario(client):
+        ws = await client.ws_connect("/ws?acks=1")
+        await ws.send_bytes(jpeg.tobytes())
+        ack = await ws.receive_json()
+        assert ack == {"type": "frame", "index": 0, "pose": False, "count": 0, "stage": None}
+        await ws.send_bytes(b"")
+        assert (await ws.receive_json())["type"] == "error"
+        await ws.send_bytes(b"not a jpeg")
+        assert (await ws.receive_json())["type"] == "error"
+        await ws.send_json({"type": "end"})
+        summary = await ws.receive_json()
+        assert summary == {"type": "summary", "pushup_count": 0, "frames_processed": 3}
+        await ws.close()
+    run_with_client(scenario, pool_size=1)
+
+def test_cancelled_handler_waits_for_pose_thread():
+    pool = DetectorPool(size=1)
+    started = threading.Event()
+    finished = threading.Event()
+
+    def blocking_call():
+        started.set()
+        finished.wait(1.0)
+        return "done"
+
+    async def main():
+        task = asyncio.ensure_future(server._run_guarded(pool, blocking_call))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        # Still waiting on the pose thread: the handler's finally has not run yet
+        assert not task.done()
+        finished.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    pool.executor.shutdown()
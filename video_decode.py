@@ -0,0 +1,178 @@
+import argparse
+import itertools
+import json
+import sys
+import time
+
+from lazy_imports import LazyModule
+
+cv2 = LazyModule("cv2")
+
+BACKENDS = ("auto", "ffmpeg", "gstreamer", "msmf", "avfoundation")
+HW_ACCEL = ("none", "any", "vaapi", "d3d11", "mfx")
+
+def available_backends():
+    """Names from BACKENDS that this OpenCV build can actually open files with"""
+    registry = cv2.videoio_registry
+    names = ["auto"]
+    for backend in registry.getStreamBackends():
+        name = registry.getBackendName(backend).lower()
+        if name in BACKENDS and registry.hasBackend(backend):
+            names.append(name)
+    return names
+
+class DecodeOptions:
+    """How video files are opened: capture backend, decoder threads, hardware acceleration and output size.
+
+    threads=0 lets the backend choose (FFmpeg uses every core); hw_accel asks the
+    backend for a hardware decoder and silently falls back to software if none is
+    available. With size set, the GStreamer backend scales inside the decode
+    pipeline so full-resolution frames are never converted to BGR or copied out;
+    other backends return full-size frames and resizing stays with the caller.
+    """
+    def __init__(self, backend="auto", threads=0, hw_accel="none", size=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r} (expected one of {', '.join(BACKENDS)})")
+        if hw_accel not in HW_ACCEL:
+            raise ValueError(f"Unknown hardware acceleration {hw_accel!r} (expected one of {', '.join(HW_ACCEL)})")
+        self.backend = backend
+        self.threads = threads
+        self.hw_accel = hw_accel
+        self.size = size
+
+    def describe(self):
+        """JSON-friendly summary (benchmark output)"""
+        return {
+            "backend": self.backend,
+            "threads": self.threads,
+            "hw_accel": self.hw_accel,
+            "size": list(self.size) if self.size else None,
+        }
+
+    def pixel_settings(self):
+        """The options that can change decoded pixels (part of the landmark cache key), or None for defaults"""
+        if self.backend == "auto" and self.hw_accel == "none" and not self.scales_in_decoder():
+            return None
+        return {"backend": self.backend, "hw_accel": self.hw_accel, "scaled": self.scales_in_decoder()}
+
+    def scales_in_decoder(self):
+        return self.backend == "gstreamer" and self.size is not None
+
+    def _params(self):
+        params = []
+        if self.threads:
+            params += [cv2.CAP_PROP_N_THREADS, self.threads]
+        if self.hw_accel != "none":
+            params += [cv2.CAP_PROP_HW_ACCELERATION, getattr(cv2, "VIDEO_ACCELERATION_" + self.hw_accel.upper())]
+        return params
+
+    def _gstreamer_pipeline(self, video_path):
+        width, height = self.size
+        # Quote the location so paths with spaces survive gst_parse_launch
+        location = video_path.replace("\\", "/").replace('"', '\\"')
+        # Scale in the decoder's own format first, so only the small frame is converted to BGR
+        return (f'filesrc location="{location}" ! decodebin ! videoscale ! '
+                f"video/x-raw,width={width},height={height} ! videoconvert ! "
+                f"video/x-raw,format=BGR ! appsink drop=false sync=false")
+
+def open_video(video_path, options=None):
+    """Open a video file with the given DecodeOptions (defaults: OpenCV's own choice).
+
+    Returns a cv2.VideoCapture; check isOpened() as usual. Frames may already be
+    options.size when options.scales_in_decoder(), so callers should keep
+    resizing through resize_into, which skips frames that are already the right size.
+    """
+    if options is None or (options.backend == "auto" and not options._params()):
+        return cv2.VideoCapture(video_path)
+
+    if options.scales_in_decoder():
+        return cv2.VideoCapture(options._gstreamer_pipeline(video_path), cv2.CAP_GSTREAMER)
+
+    api = cv2.CAP_ANY if options.backend == "auto" else getattr(cv2, "CAP_" + options.backend.upper())
+    return cv2.VideoCapture(video_path, api, options._params())
+
+def benchmark_decode(video_path, options, max_frames=None):
+    """Decode-only throughput for one configuration: frames are read into a reused buffer and discarded"""
+    open_start = time.perf_counter()
+    cap = open_video(video_path, options)
+    if not cap.isOpened():
+        return dict(options.describe(), error="Could not open video with these options")
+    open_seconds = time.perf_counter() - open_start
+
+    frames = 0
+    buffer = None
+    shape = None
+    start = time.perf_counter()
+    while max_frames is None or frames < max_frames:
+        ret, buffer = cap.read(buffer)
+        if not ret:
+            break
+        shape = buffer.shape
+        frames += 1
+    elapsed = time.perf_counter() - start
+
+    result = dict(options.describe(), backend_used=cap.getBackendName(),
+                  hw_accel_used=int(cap.get(cv2.CAP_PROP_HW_ACCELERATION)))
+    cap.release()
+    result.update({
+        "frames": frames,
+        "frame_shape": list(shape) if shape else None,
+        "open_ms": round(open_seconds * 1000, 2),
+        "decode_fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+    })
+    return result
+
+def parse_size(text):
+    """'800x600' -> (800, 600)"""
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+def main():
+    """Command line entry point: compare decode configurations on a video"""
+    parser = argparse.ArgumentParser(description="Measure pure video decode throughput per backend, thread count and acceleration")
+    parser.add_argument("video", help="Video file to decode")
+    parser.add_argument("--backends", nargs="+", default=None,
+                        help="Backends to try (default: every available one)")
+    parser.add_argument("--threads", nargs="+", type=int, default=[0, 1, 2, 4],
+                        help="Decoder thread counts to try, 0 = backend default (default: 0 1 2 4)")
+    parser.add_argument("--hw-accel", nargs="+", choices=HW_ACCEL, default=["none", "any"],
+                        help="Hardware acceleration modes to try (default: none any)")
+    parser.add_argument("--size", type=parse_size, default=None,
+                        help="Target size WxH for backends that can scale while decoding (e.g. 800x600)")
+    parser.add_argument("-n", "--max-frames", type=int, default=None, help="Stop after this many frames per run")
+    parser.add_argument("-o", "--output", help="Write all results as JSON to this file")
+    args = parser.parse_args()
+
+    backends = args.backends or available_backends()
+    results = []
+    for backend, threads, hw_accel in itertools.product(backends, args.threads, args.hw_accel):
+        try:
+            options = DecodeOptions(backend, threads, hw_accel, args.size)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+        result = benchmark_decode(args.video, options, args.max_frames)
+        results.append(result)
+        label = f"{backend:<10} threads={threads:<2} hw={hw_accel:<5}"
+        if "error" in result:
+            print(f"{label}  {result['error']}")
+        else:
+            print(f"{label}  {result['decode_fps']:>9.1f} fps  open {result['open_ms']:>7.1f} ms  "
+                  f"({result['backend_used']}, {result['frames']} frames, "
+                  f"{result['frame_shape'][1]}x{result['frame_shape'][0]})")
+
+    decoded = [r for r in results if "error" not in r and r["frames"] > 0]
+    if not decoded:
+        print("Error: No configuration could decode the video")
+        return 1
+    best = max(decoded, key=lambda r: r["decode_fps"])
+    print(f"\nFastest: --backend {best['backend']} --decode-threads {best['threads']} "
+          f"--hw-accel {best['hw_accel']} ({best['decode_fps']:.1f} fps)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"video": args.video, "results": results, "fastest": best}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())